@@ -0,0 +1,92 @@
+import json
+from flask import Response
+from sqlalchemy import Date, DateTime, Enum, Text, case, cast, func, literal, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from json_provider import encode_json
+from pagination import encode_cursor
+
+
+def get_json_agg(args):
+    """`?json_agg=1` asks Postgres to build the JSON of a list."""
+    return args.get("json_agg", "0").lower() in ("1", "true")
+
+
+def _timestamp_text(column):
+    # str() of a Python datetime: microseconds only when there are some
+    text = func.to_char(column, "YYYY-MM-DD HH24:MI:SS")
+    fraction = case(
+        (func.date_trunc("second", column) == column, ""),
+        else_=func.to_char(column, ".US"),
+    )
+    return text.concat(fraction)
+
+
+def _json_value(model, field, column):
+    """SQL expression giving the payload value of the field, as the model serializers do."""
+    kind = getattr(model, field).property.columns[0].type
+    if isinstance(kind, Enum) and kind.enum_class is not None:
+        # Postgres stores the member names, the payload has the values
+        members = kind.enum_class.__members__
+        if any(name != member.value for name, member in members.items()):
+            return case(
+                {name: member.value for name, member in members.items()}, value=column
+            )
+        return column
+    if isinstance(kind, DateTime):
+        return _timestamp_text(column)
+    if isinstance(kind, Date):
+        return cast(column, Text)
+    return column
+
+
+def json_object(model, fields, columns):
+    """json_build_object() of the fields of model, read from columns (by key)."""
+    arguments = []
+    for field in fields:
+        arguments += [literal(field), _json_value(model, field, columns[field])]
+    return func.json_build_object(*arguments)
+
+
+def json_page(query, model, fields, order, limit, after=None):
+    """
+    keyset_page() of a projected query, with the page encoded by Postgres
+    in one statement: returns (JSON array text, next_cursor).
+    """
+    if after is not None:
+        query = query.filter(tuple_(*order) > tuple_(*after))
+    position = func.row_number().over(order_by=order).label("page_position")
+    page = query.add_columns(position).order_by(*order).limit(limit + 1).subquery()
+
+    in_page = page.c.page_position <= limit
+    keys = [page.c[column.key] for column in order]
+    items = func.json_agg(
+        aggregate_order_by(json_object(model, fields, page.c), *keys)
+    ).filter(in_page)
+    last = func.json_agg(func.json_build_array(*keys)).filter(
+        page.c.page_position == limit
+    )
+    text, more, last_keys = query.session.query(
+        cast(func.coalesce(items, func.json_build_array()), Text),
+        func.bool_or(page.c.page_position > limit),
+        cast(last, Text),
+    ).select_from(page).one()
+
+    next_cursor = encode_cursor(json.loads(last_keys)[0]) if more else None
+    return text, next_cursor
+
+
+def json_rows(query, model, fields):
+    """Query of the JSON text of each row of a projected query."""
+    columns = {column["name"]: column["expr"] for column in query.column_descriptions}
+    return query.with_entities(cast(json_object(model, fields, columns), Text))
+
+
+def json_page_response(key, items, limit, next_cursor):
+    """List response around the JSON text built by Postgres, not parsed again."""
+    body = b'{"success":true,"%s":%s,"limit":%s,"next_cursor":%s}\n' % (
+        key.encode("utf-8"),
+        items.encode("utf-8"),
+        encode_json(limit),
+        encode_json(next_cursor),
+    )
+    return Response(body, mimetype="application/json")
@@ -1,19 +1,57 @@
 # TODO: Resolver problema de versionamento do flask migrate
 # TODO: Verificar/ refazer testes
 
+from startup import startup_profile
 import os
-from flask import Flask, request, jsonify, abort, redirect
+import logging
+import click
+from flask import Flask, Response, request, jsonify, abort, redirect
 from flask_cors import CORS
 import sqlalchemy
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from models import (
     setup_db,
     db_drop_and_create_all,
+    db_insert_data,
+    database_path,
     setup_migrations,
+    create_search_indexes,
     Actor,
     Movie,
+    Casting,
     db,
 )
-from auth.auth import AuthError, requires_auth
+from auth.auth import AuthError, requires_auth, permission_registry, token_cache
+from pagination import get_page_args, keyset_page
+from counts import table_count
+from search import get_search_query, search_page
+from filters import actor_filters, movie_filters, FilterError
+from projections import get_fields, projected_query, projection_serializer
+from aggregation import get_json_agg, json_page, json_page_response, json_rows
+from streaming import get_stream_format, stream_response
+from etags import list_etag, row_etag, is_fresh, not_modified, with_etag
+from response_cache import response_cache
+from metrics import pool_metrics, request_metrics, setup_request_metrics
+from queries import slow_query_log, setup_query_profiling
+from logs import setup_logging
+from bulk import (
+    BulkError,
+    get_bulk_mode,
+    get_bulk_items,
+    bulk_insert,
+    bulk_update,
+    bulk_delete,
+    parse_bulk_update,
+    parse_bulk_delete,
+    validate_actor,
+    validate_movie,
+)
+
+
+logger = logging.getLogger(__name__)
+
+startup_profile.mark("import")
 
 # Não está funcionando
 # db_drop_and_create_all()
@@ -27,17 +65,33 @@ CALLBACK_URI = os.environ.get("CALLBACK_URI")
 
 def create_app(test_config=None):
     # Basic app configuration
+    startup_profile.restart()
     app = Flask(__name__)
-    setup_db(app)
+    if test_config:
+        app.config.from_mapping(test_config)
+    setup_logging()
+    setup_db(app, app.config.get("SQLALCHEMY_DATABASE_URI", database_path))
+    startup_profile.mark("create_app.setup_db")
 
     # TODO migrations not working
     setup_migrations(app)
+    startup_profile.mark("create_app.migrations")
     CORS(app, resources={r"/api/*": {"origins": "*"}})
+    setup_request_metrics(app)
+    # Per worker cache counters, added up with the request metrics
+    for name, description, read in (
+        ("token_cache_hits_total", "Tokens found in the verified token cache.", lambda: token_cache.hits),
+        ("token_cache_misses_total", "Tokens verified again.", lambda: token_cache.misses),
+        ("response_cache_hits_total", "Responses served from the response cache.", lambda: response_cache.hits),
+        ("response_cache_misses_total", "Response cache lookups without a fresh entry.", lambda: response_cache.misses),
+    ):
+        request_metrics.add_counter(name, description, read)
+    setup_query_profiling(app)
 
     @app.after_request
     def after_request(response):
         response.headers.add(
-            "Access-Control-Allow-Headers", "Content-Type,Authorization,true"
+            "Access-Control-Allow-Headers", "Content-Type,Authorization,X-Read-Primary,true"
         )
         response.headers.add(
             "Access-Control-Allow-Methods", "GET,PUT,POST,DELETE,OPTIONS"
@@ -48,6 +102,23 @@ def create_app(test_config=None):
     def index():
         return jsonify({"success": True, "message": "Casting Agency API"})
 
+    @app.route("/metrics")
+    def retrieve_metrics():
+        return Response(
+            request_metrics.render(), mimetype="text/plain; version=0.0.4"
+        )
+
+    # Statement fingerprints and pool state are not for every client
+    @app.route("/metrics/slow-queries")
+    @requires_auth("get:metrics")
+    def retrieve_slow_queries(payload):
+        return jsonify({"success": True, "slow_queries": slow_query_log.snapshot()})
+
+    @app.route("/metrics/pool")
+    @requires_auth("get:metrics")
+    def retrieve_pool_metrics(payload):
+        return jsonify({"success": True, "pool": pool_metrics.snapshot()})
+
     @app.route("/login")
     def redirect_login():
         login_url = f"https://{AUTH0_DOMAIN}/authorize?audience={API_AUDIENCE}&response_type=token&client_id={CLIENT_ID}&redirect_uri={CALLBACK_URI}"
@@ -61,36 +132,141 @@ def create_app(test_config=None):
     @app.route("/actors", methods=["GET"])  # 🆗
     @requires_auth("get:actors")
     def retrieve_actors(payload):
-        print("retrieve_actors")
+        try:
+            conditions = actor_filters(request.args)
+            fields = get_fields(request.args, Actor)
+        except FilterError as error:
+            logger.info("Bad request: %s", error)
+            abort(400)
+
+        stream_format = get_stream_format(request)
+        etag = list_etag(Actor, request, stream_format)
+        if is_fresh(etag, request):
+            return not_modified(etag)
+
+        # Only the asked columns, read as rows rather than Actor instances
+        order = (Actor.name, Actor.id)
+        query = projected_query(Actor, fields, order).filter(*conditions)
+        serialize = projection_serializer(Actor, fields)
+        # Postgres builds the JSON, the text is sent as is
+        json_agg = get_json_agg(request.args)
+        if stream_format and json_agg:
+            return with_etag(
+                stream_response(
+                    json_rows(query, Actor, fields).order_by(*order),
+                    "actors",
+                    stream_format,
+                    lambda row: row[0],
+                    str.encode,
+                ),
+                etag,
+            )
+        if stream_format:
+            return with_etag(
+                stream_response(
+                    query.order_by(*order), "actors", stream_format, serialize
+                ),
+                etag,
+            )
+
+        cache_key = response_cache.key_for(request, payload)
+        cached = response_cache.get(cache_key, etag)
+        if cached is not None:
+            return cached
+
+        try:
+            limit, after = get_page_args(request.args, 2)
+        except ValueError as error:
+            logger.info("Bad request: %s", error)
+            abort(400)
+
         connection_error = False
         try:
-            actors = Actor.query.order_by(Actor.name).all()
-            print("retrieve_actors", actors)
+            if json_agg:
+                actors, next_cursor = json_page(query, Actor, fields, order, limit, after)
+            else:
+                actors, next_cursor = keyset_page(query, order, limit, after)
 
         except Exception as error:
             connection_error = True
-            print(error)
+            logger.error("Error query data: %s", error)
         finally:
             db.session.close()
         if connection_error:
             abort(422)
 
-        if len(actors) == 0:
+        # No match for a filter is an empty page, not a missing resource
+        empty = actors == "[]" if json_agg else len(actors) == 0
+        if empty and not conditions:
             abort(404)
 
-        actors_listed = [actor.format_json() for actor in actors]
-        return jsonify({"success": True, "actors": actors_listed}), 200
+        if json_agg:
+            response = json_page_response("actors", actors, limit, next_cursor)
+        else:
+            actors_listed = list(map(serialize, actors))
+            response = jsonify(
+                {
+                    "success": True,
+                    "actors": actors_listed,
+                    "limit": limit,
+                    "next_cursor": next_cursor,
+                }
+            )
+        response_cache.put(
+            cache_key, with_etag(response, etag), etag, [response_cache.table_tag(Actor)]
+        )
+        return response, 200
+
+    @app.route("/actors/search", methods=["GET"])
+    @requires_auth("get:actors")
+    def search_actors(payload):
+        try:
+            q = get_search_query(request.args)
+            limit, after = get_page_args(request.args, 2)
+        except ValueError as error:
+            logger.info("Bad request: %s", error)
+            abort(400)
+
+        connection_error = False
+        try:
+            rows, next_cursor = search_page(Actor, Actor.name, q, limit, after)
+            actors_found = [
+                dict(actor.format_json(), score=round(float(score), 4))
+                for actor, score in rows
+            ]
+        except Exception as error:
+            connection_error = True
+            logger.error("Error query data: %s", error)
+        finally:
+            db.session.close()
+        if connection_error:
+            abort(422)
+
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "actors": actors_found,
+                    "limit": limit,
+                    "next_cursor": next_cursor,
+                }
+            ),
+            200,
+        )
 
     @app.route("/actors/<int:actor_id>", methods=["GET"])  # 🆗
     @requires_auth("get:actors")
     def retrieve_actor(payload, actor_id):
+        etag = row_etag(Actor, actor_id)
+        if is_fresh(etag, request):
+            return not_modified(etag)
+
         connection_error = False
         try:
             id_actor = Actor.query.filter(Actor.id == actor_id).one_or_none()
         except Exception as error:
             connection_error = True
-            message = f"Database connection error: {error}"
-            print(message)
+            logger.error("Database connection error: %s", error)
         finally:
             db.session.close()
 
@@ -101,14 +277,13 @@ def create_app(test_config=None):
         if id_actor is None:
             abort(404)
 
-        return jsonify({"success": True, "actor": id_actor.format_json()}), 200
+        response = jsonify({"success": True, "actor": id_actor.format_json()})
+        return with_etag(response, etag), 200
 
     @app.route("/actors/create", methods=["POST"])  # 🆗
     @requires_auth("post:actor")
     def publish_actor(payload):
-        print("publish_actor")
         new_actor_json = request.get_json()
-        print("publish_actor", new_actor_json)
 
         if new_actor_json:
             name = new_actor_json.get("name", None)
@@ -136,21 +311,22 @@ def create_app(test_config=None):
                     seeking_movie=seeking_movie,
                 )
                 new_actor.insert()
-                print(f"add_actor -> actor {name} inserted")
+                response_cache.invalidate_table(Actor)
+                logger.info("Actor %s inserted", new_actor.id)
+                actors_total, count_mode = table_count(Actor)
 
                 return jsonify(
                     {
                         "success": True,
                         "actor_id": new_actor.id,
-                        "actors_total": len(
-                            Actor.query.all()
-                        )
+                        "actors_total": actors_total,
+                        "count_mode": count_mode,
                     }
                 )
             except Exception as err:
                 db.session.rollback()
                 connection_error = True
-                print("Error inserting Actor entry:", err)
+                logger.error("Error inserting Actor entry: %s", err)
             finally:
                 db.session.close()
             if connection_error:
@@ -158,6 +334,98 @@ def create_app(test_config=None):
         else:
             abort(400)
 
+    @app.route("/actors/bulk", methods=["POST"])
+    @requires_auth("post:actor")
+    def publish_actors_bulk(payload):
+        mode = get_bulk_mode(request.args)
+        actors = get_bulk_items(request.get_json(silent=True), "actors")
+
+        connection_error = False
+        try:
+            created, errors = bulk_insert(Actor, actors, validate_actor, mode)
+        except BulkError:
+            raise
+        except Exception as err:
+            connection_error = True
+            logger.error("Error inserting Actor entries: %s", err)
+        finally:
+            db.session.close()
+        if connection_error:
+            abort(422)
+
+        if created:
+            response_cache.invalidate_table(Actor)
+        return jsonify(
+            {
+                "success": True,
+                "mode": mode,
+                "created": created,
+                "errors": errors,
+            }
+        )
+
+    @app.route("/actors/bulk", methods=["PATCH"])
+    @requires_auth("patch:actors")
+    def modify_actors_bulk(payload):
+        conditions, changes, max_rows, dry_run = parse_bulk_update(
+            Actor, request.get_json(silent=True), request.args
+        )
+
+        connection_error = False
+        try:
+            updated = bulk_update(Actor, conditions, changes, max_rows, dry_run)
+        except BulkError:
+            raise
+        except Exception as err:
+            connection_error = True
+            logger.error("Unable to update data: %s", err)
+        finally:
+            db.session.close()
+        if connection_error:
+            abort(422)
+
+        if updated and not dry_run:
+            response_cache.invalidate_table(Actor)
+        return jsonify(
+            {
+                "success": True,
+                "dry_run": dry_run,
+                "updated": updated,
+                "count": len(updated),
+            }
+        )
+
+    @app.route("/actors/bulk", methods=["DELETE"])
+    @requires_auth("delete:actors")
+    def delete_actors_bulk(payload):
+        conditions, max_rows, dry_run = parse_bulk_delete(
+            Actor, request.get_json(silent=True), request.args
+        )
+
+        connection_error = False
+        try:
+            deleted = bulk_delete(Actor, conditions, max_rows, dry_run)
+        except BulkError:
+            raise
+        except Exception as err:
+            connection_error = True
+            logger.error("Unable to remove entries: %s", err)
+        finally:
+            db.session.close()
+        if connection_error:
+            abort(422)
+
+        if deleted and not dry_run:
+            response_cache.invalidate_table(Actor)
+        return jsonify(
+            {
+                "success": True,
+                "dry_run": dry_run,
+                "deleted": deleted,
+                "count": len(deleted),
+            }
+        )
+
     @app.route("/actors/<int:actor_id>", methods=["PATCH"])  # 🆗
     @requires_auth("patch:actors")
     def modify_actor(payload, actor_id):
@@ -182,7 +450,7 @@ def create_app(test_config=None):
             try:
                 actor = db.session.query(Actor).filter_by(id=actor_id).one_or_none()
             except Exception as err:
-                print("Query error, ", err)
+                logger.error("Query error: %s", err)
                 connection_error = True
             if connection_error:
                 abort(422)
@@ -197,7 +465,8 @@ def create_app(test_config=None):
                 actor.phone = phone
                 actor.photo = photo
                 actor.seeking_movie = seeking_movie
-                db.session.commit()
+                actor.update()
+                response_cache.invalidate_table(Actor)
         
                 actor_update = Actor.query.get(actor_id)
                 return (
@@ -207,7 +476,7 @@ def create_app(test_config=None):
             except Exception as err:
                 update_error = True
                 db.session.rollback()
-                print(f"Unable to update data: {err}")
+                logger.error("Unable to update data: %s", err)
             finally:
                 db.session.close()
             if update_error:
@@ -223,7 +492,7 @@ def create_app(test_config=None):
         try:
             actor = Actor.query.filter(Actor.id == actor_id).one_or_none()
         except Exception as err:
-            print("Query error, ", err)
+            logger.error("Query error: %s", err)
             connection_error = True
         if connection_error:
             abort(422)
@@ -231,11 +500,12 @@ def create_app(test_config=None):
             abort(404)
         try:
             actor.delete()
+            response_cache.invalidate_table(Actor)
             return jsonify({"success": True, "deleted_actor": actor.format_json()}), 200
         except Exception as err:
             delete_error = True
             db.session.rollback()
-            print(f"Error deleting Actor entry: {err}")
+            logger.error("Error deleting Actor entry: %s", err)
         finally:
             db.session.close()
         if delete_error:
@@ -244,12 +514,63 @@ def create_app(test_config=None):
     @app.route("/movies", methods=["GET"])  # 🆗
     @requires_auth("get:movies")
     def retrieve_movies(payload):
+        try:
+            conditions = movie_filters(request.args)
+            fields = get_fields(request.args, Movie)
+        except FilterError as error:
+            logger.info("Bad request: %s", error)
+            abort(400)
+
+        stream_format = get_stream_format(request)
+        etag = list_etag(Movie, request, stream_format)
+        if is_fresh(etag, request):
+            return not_modified(etag)
+
+        # Only the asked columns, read as rows rather than Movie instances
+        order = (Movie.title, Movie.id)
+        query = projected_query(Movie, fields, order).filter(*conditions)
+        serialize = projection_serializer(Movie, fields)
+        # Postgres builds the JSON, the text is sent as is
+        json_agg = get_json_agg(request.args)
+        if stream_format and json_agg:
+            return with_etag(
+                stream_response(
+                    json_rows(query, Movie, fields).order_by(*order),
+                    "movies",
+                    stream_format,
+                    lambda row: row[0],
+                    str.encode,
+                ),
+                etag,
+            )
+        if stream_format:
+            return with_etag(
+                stream_response(
+                    query.order_by(*order), "movies", stream_format, serialize
+                ),
+                etag,
+            )
+
+        cache_key = response_cache.key_for(request, payload)
+        cached = response_cache.get(cache_key, etag)
+        if cached is not None:
+            return cached
+
+        try:
+            limit, after = get_page_args(request.args, 2)
+        except ValueError as error:
+            logger.info("Bad request: %s", error)
+            abort(400)
+
         connection_error = False
         try:
-            movies = Movie.query.order_by(Movie.title).all()
+            if json_agg:
+                movies, next_cursor = json_page(query, Movie, fields, order, limit, after)
+            else:
+                movies, next_cursor = keyset_page(query, order, limit, after)
         except Exception as error:
             connection_error = True
-            print(f"Error query data: {error}")
+            logger.error("Error query data: %s", error)
         finally:
             db.session.close()
         if connection_error:
@@ -257,18 +578,121 @@ def create_app(test_config=None):
         if movies is None:
             abort(404)
         
-        movies_listed = [movie.format_json() for movie in movies]
-        return jsonify({"success": True, "movies": movies_listed}), 200
+        if json_agg:
+            response = json_page_response("movies", movies, limit, next_cursor)
+        else:
+            movies_listed = list(map(serialize, movies))
+            response = jsonify(
+                {
+                    "success": True,
+                    "movies": movies_listed,
+                    "limit": limit,
+                    "next_cursor": next_cursor,
+                }
+            )
+        response_cache.put(
+            cache_key, with_etag(response, etag), etag, [response_cache.table_tag(Movie)]
+        )
+        return response, 200
+
+    @app.route("/movies/search", methods=["GET"])
+    @requires_auth("get:movies")
+    def search_movies(payload):
+        try:
+            q = get_search_query(request.args)
+            limit, after = get_page_args(request.args, 2)
+        except ValueError as error:
+            logger.info("Bad request: %s", error)
+            abort(400)
+
+        connection_error = False
+        try:
+            rows, next_cursor = search_page(Movie, Movie.title, q, limit, after)
+            movies_found = [
+                dict(movie.format_json(), score=round(float(score), 4))
+                for movie, score in rows
+            ]
+        except Exception as error:
+            connection_error = True
+            logger.error("Error query data: %s", error)
+        finally:
+            db.session.close()
+        if connection_error:
+            abort(422)
+
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "movies": movies_found,
+                    "limit": limit,
+                    "next_cursor": next_cursor,
+                }
+            ),
+            200,
+        )
+
+    @app.route("/movies/genres", methods=["GET"])
+    @requires_auth("get:movies")
+    def retrieve_movie_genres(payload):
+        try:
+            conditions = movie_filters(request.args)
+        except FilterError as error:
+            logger.info("Bad request: %s", error)
+            abort(400)
+
+        etag = list_etag(Movie, request, "genres")
+        if is_fresh(etag, request):
+            return not_modified(etag)
+
+        cache_key = response_cache.key_for(request, payload)
+        cached = response_cache.get(cache_key, etag)
+        if cached is not None:
+            return cached
+
+        connection_error = False
+        try:
+            # One GROUP BY over the unnested genres of the matching movies
+            unnested = (
+                sqlalchemy.select(func.unnest(Movie.genres).label("genre"))
+                .where(*conditions)
+                .subquery()
+            )
+            movies = func.count().label("movies")
+            rows = (
+                db.session.query(unnested.c.genre, movies)
+                .group_by(unnested.c.genre)
+                .order_by(movies.desc(), unnested.c.genre)
+                .all()
+            )
+            genres = [{"genre": name, "movies": count} for name, count in rows]
+        except Exception as error:
+            connection_error = True
+            logger.error("Error query data: %s", error)
+        finally:
+            db.session.close()
+        if connection_error:
+            abort(422)
+
+        response = jsonify({"success": True, "genres": genres})
+        response_cache.put(
+            cache_key, with_etag(response, etag), etag, [response_cache.table_tag(Movie)]
+        )
+        return response, 200
 
     @app.route("/movies/<int:movie_id>", methods=["GET"])  # 🆗
     @requires_auth("get:movies")
     def retrieve_movie(payload, movie_id):
+        etag = row_etag(Movie, movie_id)
+        if is_fresh(etag, request):
+            return not_modified(etag)
+
         connection_error = False
         try:
             movie = Movie.query.filter(Movie.id == movie_id).one_or_none()
         except Exception as error:
             connection_error = True
-            print(f"Database connection error: {error}")
+            logger.error("Database connection error: %s", error)
         finally:
             db.session.close()
         if connection_error:
@@ -276,7 +700,8 @@ def create_app(test_config=None):
         if movie is None:
             abort(404)
 
-        return jsonify({"success": True, "movie": movie.format_json()}), 200
+        response = jsonify({"success": True, "movie": movie.format_json()})
+        return with_etag(response, etag), 200
 
     @app.route("/movies/create", methods=["POST"])  
     @requires_auth("post:movie")
@@ -303,22 +728,25 @@ def create_app(test_config=None):
                     seeking_actor=seeking_actor,
                 )
                 movie.insert()
+                response_cache.invalidate_table(Movie)
+                movies_total, count_mode = table_count(Movie)
 
                 return jsonify(
                     {
                         "success": True,
                         "movie_id": movie.id,
-                        "movies_total": len(Movie.query.all()),
+                        "movies_total": movies_total,
+                        "count_mode": count_mode,
                     }
                 )
             except sqlalchemy.exc.IntegrityError as error:
                 insert_error = True
                 db.session.rollback()
-                print(f"Constraint violation {error}")
+                logger.warning("Constraint violation: %s", error)
             except Exception as err:
                 insert_error = True
                 db.session.rollback()
-                print(f"unable to insert data {err}")
+                logger.error("Unable to insert data: %s", err)
             finally:
                 db.session.close()
             if insert_error:
@@ -326,6 +754,98 @@ def create_app(test_config=None):
         else:
             abort(400)
 
+    @app.route("/movies/bulk", methods=["POST"])
+    @requires_auth("post:movie")
+    def add_movies_bulk(payload):
+        mode = get_bulk_mode(request.args)
+        movies = get_bulk_items(request.get_json(silent=True), "movies")
+
+        insert_error = False
+        try:
+            created, errors = bulk_insert(Movie, movies, validate_movie, mode)
+        except BulkError:
+            raise
+        except Exception as err:
+            insert_error = True
+            logger.error("Unable to insert data: %s", err)
+        finally:
+            db.session.close()
+        if insert_error:
+            abort(422)
+
+        if created:
+            response_cache.invalidate_table(Movie)
+        return jsonify(
+            {
+                "success": True,
+                "mode": mode,
+                "created": created,
+                "errors": errors,
+            }
+        )
+
+    @app.route("/movies/bulk", methods=["PATCH"])
+    @requires_auth("patch:movies")
+    def modify_movies_bulk(payload):
+        conditions, changes, max_rows, dry_run = parse_bulk_update(
+            Movie, request.get_json(silent=True), request.args
+        )
+
+        connection_error = False
+        try:
+            updated = bulk_update(Movie, conditions, changes, max_rows, dry_run)
+        except BulkError:
+            raise
+        except Exception as err:
+            connection_error = True
+            logger.error("Unable to update data: %s", err)
+        finally:
+            db.session.close()
+        if connection_error:
+            abort(422)
+
+        if updated and not dry_run:
+            response_cache.invalidate_table(Movie)
+        return jsonify(
+            {
+                "success": True,
+                "dry_run": dry_run,
+                "updated": updated,
+                "count": len(updated),
+            }
+        )
+
+    @app.route("/movies/bulk", methods=["DELETE"])
+    @requires_auth("delete:movies")
+    def delete_movies_bulk(payload):
+        conditions, max_rows, dry_run = parse_bulk_delete(
+            Movie, request.get_json(silent=True), request.args
+        )
+
+        connection_error = False
+        try:
+            deleted = bulk_delete(Movie, conditions, max_rows, dry_run)
+        except BulkError:
+            raise
+        except Exception as err:
+            connection_error = True
+            logger.error("Unable to remove entries: %s", err)
+        finally:
+            db.session.close()
+        if connection_error:
+            abort(422)
+
+        if deleted and not dry_run:
+            response_cache.invalidate_table(Movie)
+        return jsonify(
+            {
+                "success": True,
+                "dry_run": dry_run,
+                "deleted": deleted,
+                "count": len(deleted),
+            }
+        )
+
     @app.route("/movies/<int:movie_id>", methods=["PATCH"])  # 🆗
     @requires_auth("patch:movies")
     def modify_movie(payload, movie_id):
@@ -348,7 +868,7 @@ def create_app(test_config=None):
                 movie = db.session.query(Movie).filter_by(id=movie_id).first()
             except Exception as err:
                 connection_error = True
-                print("Query error, ", err)
+                logger.error("Query error: %s", err)
             if connection_error:
                 abort(422)
             if movie is None:
@@ -360,6 +880,7 @@ def create_app(test_config=None):
                 movie.release_date = release_date
                 movie.seeking_actor = seeking_actor
                 movie.update()
+                response_cache.invalidate_table(Movie)
 
                 # Eu ainda poderia ter um erro aqui, a consistência do banco
                 # deveria ser garantida na fase de testes e não aqui
@@ -371,7 +892,7 @@ def create_app(test_config=None):
             except Exception as err:
                 update_error = True
                 db.session.rollback()
-                print(f"Unable to update data: {err}")
+                logger.error("Unable to update data: %s", err)
             finally:
                 db.session.close()
             if update_error:
@@ -387,7 +908,7 @@ def create_app(test_config=None):
         try:
             movie = Movie.query.filter(Movie.id == movie_id).one_or_none()
         except Exception as err:
-            print("Query error, ", err)
+            logger.error("Query error: %s", err)
             connection_error = True
         finally:
             db.session.close()
@@ -399,16 +920,85 @@ def create_app(test_config=None):
             abort(404)
         try:
             movie.delete()
+            response_cache.invalidate_table(Movie)
             return jsonify({"success": True, "deleted_movie": movie.format_json()}), 200
         except Exception as err:
             delete_error = True
             db.session.rollback()
-            print(f"Unable to remove entry: {err}")
+            logger.error("Unable to remove entry: %s", err)
         finally:
             db.session.close()
         if delete_error:
             abort(500)        
 
+    def list_castings(query):
+        """
+        One page of castings with their actor and movie loaded in the same
+        query, whatever the size of the page.
+        """
+        try:
+            limit, after = get_page_args(request.args, 1)
+        except ValueError as error:
+            logger.info("Bad request: %s", error)
+            abort(400)
+
+        connection_error = False
+        try:
+            query = query.options(
+                joinedload(Casting.actor_cast), joinedload(Casting.movie_cast)
+            )
+            castings, next_cursor = keyset_page(query, (Casting.id,), limit, after)
+            castings_listed = [casting.format_json() for casting in castings]
+        except Exception as error:
+            connection_error = True
+            logger.error("Error query data: %s", error)
+        finally:
+            db.session.close()
+        if connection_error:
+            abort(422)
+
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "castings": castings_listed,
+                    "limit": limit,
+                    "next_cursor": next_cursor,
+                }
+            ),
+            200,
+        )
+
+    def exists(model, row_id):
+        connection_error = False
+        try:
+            found = db.session.query(model.id).filter(model.id == row_id).scalar()
+        except Exception as error:
+            connection_error = True
+            logger.error("Database connection error: %s", error)
+        if connection_error:
+            abort(422)
+        return found is not None
+
+    @app.route("/castings", methods=["GET"])
+    @requires_auth("get:movies")
+    def retrieve_castings(payload):
+        return list_castings(Casting.query)
+
+    @app.route("/movies/<int:movie_id>/castings", methods=["GET"])
+    @requires_auth("get:movies")
+    def retrieve_movie_castings(payload, movie_id):
+        if not exists(Movie, movie_id):
+            abort(404)
+        return list_castings(Casting.query.filter(Casting.movie_id == movie_id))
+
+    @app.route("/actors/<int:actor_id>/castings", methods=["GET"])
+    @requires_auth("get:actors")
+    def retrieve_actor_castings(payload, actor_id):
+        if not exists(Actor, actor_id):
+            abort(404)
+        return list_castings(Casting.query.filter(Casting.actor_id == actor_id))
+
     @app.errorhandler(400)
     def bad_request(error):
         return jsonify({"success": False, "error": 400, "message": "Bad Request"}), 400
@@ -452,6 +1042,20 @@ def create_app(test_config=None):
             500,
         )
 
+    @app.errorhandler(BulkError)
+    def handle_bulk_error(error):
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": error.status_code,
+                    "message": error.message,
+                    "errors": error.errors,
+                }
+            ),
+            error.status_code,
+        )
+
     @app.errorhandler(AuthError)
     def handle_auth_error(error):
         return (
@@ -465,11 +1069,53 @@ def create_app(test_config=None):
             error.status_code,
         )
 
+    @app.cli.command("permissions")
+    def list_permissions():
+        """List every route together with the permission it requires."""
+        for route in permission_registry.routes(app):
+            methods = ",".join(route["methods"])
+            print(f"{methods:<12} {route['rule']:<30} {route['permission'] or '-'}")
+
+    @app.cli.command("init-db")
+    def init_db():
+        """
+        Create the missing tables (existing ones are left untouched) and the
+        search indexes, and mark the database as up to date with the
+        migrations so `flask db upgrade` starts from there.
+        """
+        from flask_migrate import Migrate, stamp
+
+        db.create_all()
+        if not create_search_indexes():
+            print("pg_trgm is not available, search runs without its indexes")
+        if "migrate" not in app.extensions:
+            Migrate(app, db)
+        stamp()
+        print("Tables created")
+
+    @app.cli.command("seed-db")
+    def seed_db():
+        """Insert the sample movies, actors and castings."""
+        db_insert_data()
+        print("Sample data inserted")
+
+    @app.cli.command("reset-db")
+    @click.confirmation_option(prompt="This drops every table and its data, continue?")
+    def reset_db():
+        """Drop and recreate every table, then insert the sample data."""
+        db_drop_and_create_all()
+        if not create_search_indexes():
+            print("pg_trgm is not available, search runs without its indexes")
+        db_insert_data()
+        print("Database reset")
+
+    startup_profile.mark("create_app.routes")
     return app
 
 
 # Initializing the app for gunicorn
 app = create_app()
+startup_profile.report()
 
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5000, debug=True)
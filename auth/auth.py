@@ -1,11 +1,14 @@
+import logging
 from dotenv import load_dotenv
 import os
-import json
-from flask import request
+import time
+from flask import request, g
 from functools import wraps
-import jwt
-from jose import jwt
-from urllib.request import urlopen
+from .jwks import JWKSKeyStore, JWKSFetchError
+from .token_cache import VerifiedTokenCache, VerifiedToken
+from .permissions import PermissionRegistry
+
+logger = logging.getLogger(__name__)
 
 
 load_dotenv()
@@ -14,6 +17,23 @@ AUTH0_DOMAIN = os.environ.get("AUTH0_DOMAIN")
 API_AUDIENCE = os.environ.get("API_AUDIENCE")
 ALGORITHMS = [os.environ.get("ALGORITHMS")]
 
+jwks_store = JWKSKeyStore(
+    f"https://{AUTH0_DOMAIN}/.well-known/jwks.json",
+    algorithm=ALGORITHMS[0] or "RS256",
+    ttl=int(os.environ.get("JWKS_TTL", 3600)),
+    refresh_ahead=int(os.environ.get("JWKS_REFRESH_AHEAD", 300)),
+    min_refetch_interval=int(os.environ.get("JWKS_MIN_REFETCH_INTERVAL", 30)),
+)
+
+token_cache = VerifiedTokenCache(
+    max_entries=int(os.environ.get("TOKEN_CACHE_MAX_ENTRIES", 10000)),
+    max_bytes=int(os.environ.get("TOKEN_CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+)
+# Tokens signed with a key the issuer no longer publishes must be verified again
+jwks_store.add_listener(token_cache.on_key_set_change)
+
+permission_registry = PermissionRegistry()
+
 
 class AuthError(Exception):
     def __init__(self, error, status_code):
@@ -51,9 +71,19 @@ def get_token_auth_header():
     return token
 
 
-def check_permissions(permission, payload):
-    print("check_permissions", permission, payload)
-    if permission not in payload["permissions"]:
+def check_permissions(permission, payload, grants=None):
+    if "permissions" not in payload:
+        raise AuthError(
+            {"description": "Permissions not included in JWT", "status_code": 400}, 400
+        )
+
+    bit = permission_registry.bit(permission)
+    if grants is not None and bit is not None:
+        allowed = grants & bit
+    else:
+        allowed = permission in payload["permissions"]
+
+    if not allowed:
         raise AuthError(
             {
                 "description": "User don't have sufficient permission",
@@ -61,22 +91,34 @@ def check_permissions(permission, payload):
             },
             401,
         )
+    return True
 
-    if "permissions" not in payload.keys():
-        raise AuthError(
-            {"description": "Permissions not included in JWT", "status_code": 400}, 400
-        )
 
-    if "permissions" not in payload:
-        raise AuthError(
-            {"description": "Permissions not included in JWT", "status_code": 400}, 400
-        )
-    return True
+def verify_token(token):
+    """
+    Verified payload of token together with the mask of permissions it grants.
+    Both are cached until the token expires.
+    """
+    cached = token_cache.get(token)
+    if cached is not None and cached.grants_version == permission_registry.version:
+        return cached
+
+    payload, kid = decode_jwt(token)
+    grants_version = permission_registry.version
+    grants = permission_registry.grants(payload.get("permissions", []))
+    token_cache.put(
+        token, payload, kid=kid, grants=grants, grants_version=grants_version
+    )
+    return VerifiedToken(payload, grants, grants_version)
 
 
 def verify_decode_jwt(token):
-    jsonurl = urlopen(f"https://{AUTH0_DOMAIN}/.well-known/jwks.json")
-    jwks = json.loads(jsonurl.read())
+    return verify_token(token).payload
+
+
+def decode_jwt(token):
+    # Loaded on the first verification, it is not needed to start a worker
+    from jose import jwt
 
     unverified_header = jwt.get_unverified_header(token)
     if "kid" not in unverified_header:
@@ -84,18 +126,19 @@ def verify_decode_jwt(token):
             {"code": "invalid_header", "description": "Authorization malformed."}, 401
         )
 
-    rsa_key = {}
-    for key in jwks["keys"]:
-        if key["kid"] == unverified_header["kid"]:
-            rsa_key = {
-                "kty": key["kty"],
-                "kid": key["kid"],
-                "use": key["use"],
-                "n": key["n"],
-                "e": key["e"],
-            }
-
-    if rsa_key:
+    try:
+        rsa_key = jwks_store.get_key(unverified_header["kid"])
+    except JWKSFetchError as err:
+        logger.error("%s", err)
+        raise AuthError(
+            {
+                "code": "jwks_unavailable",
+                "description": "Unable to fetch the signing keys.",
+            },
+            503,
+        )
+
+    if rsa_key is not None:
         try:
             payload = jwt.decode(
                 token,
@@ -104,7 +147,7 @@ def verify_decode_jwt(token):
                 audience=API_AUDIENCE,
                 issuer="https://" + AUTH0_DOMAIN + "/",
             )
-            return payload
+            return payload, unverified_header["kid"]
 
         except jwt.ExpiredSignatureError:
             raise AuthError(
@@ -138,12 +181,19 @@ def verify_decode_jwt(token):
 
 def requires_auth(permission=""):
     def requires_auth_decorator(f):
+        permission_registry.register(permission, f.__name__)
+
         @wraps(f)
         def wrapper(*args, **kwargs):
-            token = get_token_auth_header()
-            payload = verify_decode_jwt(token)
-            check_permissions(permission, payload)
-            return f(payload, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                token = get_token_auth_header()
+                verified = verify_token(token)
+                check_permissions(permission, verified.payload, verified.grants)
+            finally:
+                # Auth phase of the request metrics
+                g.auth_seconds = time.perf_counter() - start
+            return f(verified.payload, *args, **kwargs)
 
         return wrapper
 
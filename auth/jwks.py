@@ -0,0 +1,160 @@
+import logging
+import json
+import time
+import threading
+from urllib.request import urlopen
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSFetchError(Exception):
+    """Raised when no signing keys are available at all."""
+
+
+def fetch_jwks(url, timeout=5):
+    jsonurl = urlopen(url, timeout=timeout)
+    return json.loads(jsonurl.read())
+
+
+class JWKSKeyStore:
+    """
+    Process-wide cache of the issuer signing keys, indexed by kid.
+
+    Keys are kept as prebuilt jose Key objects so verification does not
+    rebuild them on every request. The key set is refreshed in a background
+    thread once it gets close to expiring, refetched once when an unknown
+    kid shows up and kept (stale) while the issuer is unreachable.
+    """
+
+    def __init__(
+        self,
+        url,
+        algorithm="RS256",
+        ttl=3600,
+        refresh_ahead=300,
+        min_refetch_interval=30,
+        fetch=fetch_jwks,
+        clock=time.monotonic,
+    ):
+        self.url = url
+        self.algorithm = algorithm
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.min_refetch_interval = min_refetch_interval
+        self._fetch = fetch
+        self._clock = clock
+
+        self._keys = {}
+        self._expires_at = 0.0
+        self._last_attempt = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._refresh_thread = None
+        self._listeners = []
+
+    @property
+    def kids(self):
+        return frozenset(self._keys)
+
+    def add_listener(self, callback):
+        """Call callback(old_kids, new_kids) whenever the key set changes."""
+        self._listeners.append(callback)
+
+    def _build_keys(self, jwks):
+        from jose import jwk
+
+        keys = {}
+        for key in jwks.get("keys", []):
+            if "kid" not in key or key.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[key["kid"]] = jwk.construct(
+                    key, key.get("alg") or self.algorithm
+                )
+            except Exception as err:
+                logger.warning("Skipping JWKS key %s: %s", key["kid"], err)
+        return keys
+
+    def refresh(self):
+        """Fetch the key set now. Returns True when the keys were replaced."""
+        with self._lock:
+            self._last_attempt = self._clock()
+        try:
+            keys = self._build_keys(self._fetch(self.url))
+        except Exception as err:
+            logger.error("Unable to refresh JWKS from %s: %s", self.url, err)
+            return False
+
+        if not keys:
+            logger.error("JWKS from %s has no usable signing keys", self.url)
+            return False
+
+        with self._lock:
+            old_kids = frozenset(self._keys)
+            self._keys = keys
+            self._expires_at = self._clock() + self.ttl
+
+        new_kids = frozenset(keys)
+        if old_kids and old_kids != new_kids:
+            for callback in self._listeners:
+                callback(old_kids, new_kids)
+        return True
+
+    def _refresh_in_background(self):
+        with self._lock:
+            now = self._clock()
+            if self._refreshing or not self._can_refetch(now):
+                return
+            self._refreshing = True
+            self._last_attempt = now
+        self._refresh_thread = threading.Thread(
+            target=self._background_refresh, daemon=True
+        )
+        self._refresh_thread.start()
+
+    def _background_refresh(self):
+        # Only this thread clears the flag, an inline refresh running at the
+        # same time must not let a second background refresh start
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _can_refetch(self, now):
+        return (
+            self._last_attempt is None
+            or now - self._last_attempt >= self.min_refetch_interval
+        )
+
+    def get_key(self, kid):
+        """
+        Return the Key object for kid, or None when the issuer doesn't know it.
+        Raises JWKSFetchError if the keys were never fetched successfully.
+        """
+        now = self._clock()
+
+        if not self._keys:
+            if self._can_refetch(now):
+                self.refresh()
+            if not self._keys:
+                raise JWKSFetchError(f"No signing keys available from {self.url}")
+        elif now >= self._expires_at:
+            # Expired: try once inline, serve the stale keys if that fails
+            if self._can_refetch(now):
+                self.refresh()
+        elif now >= self._expires_at - self.refresh_ahead:
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and self._can_refetch(self._clock()):
+            # Unknown kid, the issuer may have rotated its keys
+            self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+            self._expires_at = 0.0
+            self._last_attempt = None
@@ -0,0 +1,56 @@
+import threading
+
+
+class PermissionRegistry:
+    """
+    Registry of the permissions required by the API routes.
+
+    Each permission passed to `requires_auth` gets a bit when the route is
+    decorated. A verified token is turned once into an integer mask of the
+    permissions it grants, so checking a route is a single bitwise AND.
+    """
+
+    def __init__(self):
+        self._bits = {}
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        # Bumped whenever a new permission gets a bit, masks built for an
+        # older version may be missing it
+        self.version = 0
+
+    def register(self, permission, endpoint=None):
+        with self._lock:
+            if permission not in self._bits:
+                self._bits[permission] = 1 << len(self._bits)
+                self.version += 1
+            if endpoint is not None:
+                self._endpoints[endpoint] = permission
+        return self._bits[permission]
+
+    def bit(self, permission):
+        return self._bits.get(permission)
+
+    def grants(self, permissions):
+        """Mask of the registered permissions included in `permissions`."""
+        mask = 0
+        for permission in permissions:
+            mask |= self._bits.get(permission, 0)
+        return mask
+
+    def permission_for(self, endpoint):
+        return self._endpoints.get(endpoint)
+
+    def routes(self, app):
+        """List every URL rule of app with the permission it requires."""
+        routes = []
+        for rule in app.url_map.iter_rules():
+            methods = sorted(rule.methods - {"HEAD", "OPTIONS"})
+            routes.append(
+                {
+                    "rule": rule.rule,
+                    "methods": methods,
+                    "endpoint": rule.endpoint,
+                    "permission": self._endpoints.get(rule.endpoint),
+                }
+            )
+        return sorted(routes, key=lambda route: (route["rule"], route["methods"]))
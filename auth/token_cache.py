@@ -0,0 +1,111 @@
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+
+VerifiedToken = namedtuple("VerifiedToken", ["payload", "grants", "grants_version"])
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of already verified JWT payloads.
+
+    Entries are keyed by the SHA-256 of the raw token (the token itself is
+    never stored) and expire at the token's own `exp` claim. The cache is
+    capped both by number of entries and by an estimate of the memory the
+    payloads use. Next to the payload each entry keeps the permission mask
+    built for the token (see PermissionRegistry).
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024, clock=time.time):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    @staticmethod
+    def _estimate_size(payload):
+        return sys.getsizeof(json.dumps(payload, default=str)) + 200
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry["size"]
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry["exp"] <= self._clock():
+                self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["token"]
+
+    def put(self, token, payload, kid=None, grants=0, grants_version=0):
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or exp <= self._clock():
+            return
+        size = self._estimate_size(payload)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = {
+                "token": VerifiedToken(payload, grants, grants_version),
+                "exp": exp,
+                "kid": kid,
+                "size": size,
+            }
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def drop_kids(self, kids):
+        """Drop every entry signed with one of the given key ids."""
+        kids = set(kids)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry["kid"] in kids]
+            for key in stale:
+                self._discard(key)
+        return len(stale)
+
+    def on_key_set_change(self, old_kids, new_kids):
+        self.drop_kids(old_kids - new_kids)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
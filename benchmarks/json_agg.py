@@ -0,0 +1,103 @@
+"""
+Time to build the body of a large GET /actors page: ORM hydration plus
+format_json() and json encoding, against the JSON built by Postgres with
+json_agg (`?json_agg=1`).
+
+`--rows` actors are inserted in a transaction that is rolled back at the
+end, so the database is left as it was. Needs the migrated database.
+
+    python benchmarks/json_agg.py --database postgresql://localhost/castAgency --rows 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from aggregation import json_page, json_page_response  # noqa: E402
+from models import Actor, GenderType  # noqa: E402
+from projections import PAYLOAD_FIELDS  # noqa: E402
+
+ORDER = (Actor.name, Actor.id)
+
+
+def fill(session, count):
+    genders = list(GenderType)
+    run = uuid.uuid4().hex[:8]
+    session.execute(
+        insert(Actor),
+        [
+            {
+                "name": f"Benchmark {index:06d}",
+                "age": 20 + index % 50,
+                "gender": genders[index % len(genders)],
+                "email": f"{run}.{index}@example.com",
+                "phone": f"{run}{index:09d}",
+                "photo": f"https://example.com/photos/{index}.jpg",
+                "seeking_movie": index % 2 == 0,
+            }
+            for index in range(count)
+        ],
+    )
+
+
+def orm_body(session, limit):
+    actors = session.query(Actor).order_by(*ORDER).limit(limit).all()
+    payload = {
+        "success": True,
+        "actors": [actor.format_json() for actor in actors],
+        "limit": limit,
+        "next_cursor": None,
+    }
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def json_agg_body(session, limit):
+    fields = PAYLOAD_FIELDS[Actor]
+    query = session.query(*(getattr(Actor, field) for field in fields))
+    items, next_cursor = json_page(query, Actor, fields, ORDER, limit)
+    return json_page_response("actors", items, limit, next_cursor).get_data()
+
+
+def measure(session, body, limit, repeat):
+    timings = []
+    for _ in range(repeat):
+        # Nothing left in the identity map: every run hydrates the rows
+        session.expunge_all()
+        start = time.perf_counter()
+        data = body(session, limit)
+        timings.append(time.perf_counter() - start)
+    return {"ms": round(min(timings) * 1000, 1), "bytes": len(data)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if not args.database:
+        parser.error("--database (or DATABASE_URL) is required")
+
+    engine = create_engine(args.database)
+    with Session(engine) as session:
+        try:
+            fill(session, args.rows)
+            session.flush()
+            results = {
+                "orm_format_json": measure(session, orm_body, args.rows, args.repeat),
+                "json_agg": measure(session, json_agg_body, args.rows, args.repeat),
+            }
+        finally:
+            session.rollback()
+    print(json.dumps({"rows": args.rows, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Time and memory of a list page: Actor instances loaded through the ORM and
+serialized with format_json(), against the column projection of the list
+endpoints (plain rows, compiled serializer), with every field and with
+`?fields=id,name`.
+
+Runs on an in-memory SQLite database filled with `--rows` actors unless
+`--database` points at a database whose "Actors" table already has rows.
+
+    DB_PORT=5432 python benchmarks/list_read.py --rows 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from models import Actor, GenderType  # noqa: E402
+from projections import PAYLOAD_FIELDS, projection_serializer  # noqa: E402
+
+
+def fill(engine, count):
+    Actor.__table__.create(engine)
+    genders = list(GenderType)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Actor),
+            [
+                {
+                    "name": f"Actor {index:06d}",
+                    "age": 20 + index % 50,
+                    "gender": genders[index % len(genders)],
+                    "email": f"actor{index}@example.com",
+                    "phone": f"55{index:09d}",
+                    "photo": f"https://example.com/photos/{index}.jpg",
+                    "seeking_movie": index % 2 == 0,
+                    "version": 1,
+                }
+                for index in range(count)
+            ],
+        )
+
+
+def orm_page(session, limit):
+    actors = session.query(Actor).order_by(Actor.name, Actor.id).limit(limit).all()
+    return [actor.format_json() for actor in actors]
+
+
+def projected_page(session, limit, fields):
+    serialize = projection_serializer(Actor, fields)
+    columns = [getattr(Actor, field) for field in fields]
+    columns += [column for column in (Actor.name, Actor.id) if column.key not in fields]
+    rows = session.query(*columns).order_by(Actor.name, Actor.id).limit(limit).all()
+    return list(map(serialize, rows))
+
+
+def measure(engine, page, repeat):
+    timings = []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            page(session)
+            timings.append(time.perf_counter() - start)
+    with Session(engine) as session:
+        tracemalloc.start()
+        page(session)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"ms": round(min(timings) * 1000, 1), "peak_mb": round(peak / 2**20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database", help="database URI, in-memory SQLite by default")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.database:
+        engine = create_engine(args.database)
+    else:
+        # In-memory SQLite keeps one connection per thread, every session
+        # sees the rows
+        engine = create_engine("sqlite://")
+        fill(engine, args.rows)
+
+    variants = {
+        "orm": lambda session: orm_page(session, args.rows),
+        "projected": lambda session: projected_page(
+            session, args.rows, PAYLOAD_FIELDS[Actor]
+        ),
+        "projected_id_name": lambda session: projected_page(
+            session, args.rows, ("id", "name")
+        ),
+    }
+    results = {name: measure(engine, page, args.repeat) for name, page in variants.items()}
+    print(json.dumps({"rows": args.rows, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
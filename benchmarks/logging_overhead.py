@@ -0,0 +1,88 @@
+"""
+Time a request thread spends logging: print() to a file, a JSON logger
+writing on the request thread and the queued logger of logs.py.
+
+Each of `--threads` threads logs `--lines` lines, the way request handlers
+do. print() and the direct logger write and flush on the request thread,
+setup_logging() only enqueues the record, formatting and writing happen on
+the listener thread. `drain_s` is the time the listener still needed once
+the threads were done.
+
+Writing to the page cache of a temporary file is about the cheapest a
+print() can be: on a pipe to a log collector that falls behind, print()
+blocks the request while the queue drops records instead (`dropped`).
+
+    python benchmarks/logging_overhead.py --lines 1000 --threads 8
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from logs import JSONFormatter, setup_logging, stop_logging  # noqa: E402
+
+MESSAGE = "Error query data: %s"
+ERROR = "relation \"Actors\" does not exist"
+
+
+def run(log_line, lines, threads):
+    """Per line latency seen by the logging threads, in microseconds."""
+
+    def worker(_):
+        start = time.perf_counter()
+        for _ in range(lines):
+            log_line()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        elapsed = sum(executor.map(worker, range(threads)))
+    return round(elapsed / (lines * threads) * 1e6, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "print.log"), "w") as output:
+
+            def print_line():
+                print(MESSAGE % ERROR, file=output, flush=True)
+
+            results["print_us"] = run(print_line, args.lines, args.threads)
+
+        logger = logging.getLogger("benchmark")
+        with open(os.path.join(directory, "direct.log"), "w") as output:
+            handler = logging.StreamHandler(output)
+            handler.setFormatter(JSONFormatter())
+            logger.addHandler(handler)
+            results["direct_us"] = run(
+                lambda: logger.error(MESSAGE, ERROR), args.lines, args.threads
+            )
+            logger.removeHandler(handler)
+
+        with open(os.path.join(directory, "queue.log"), "w") as output:
+            handler = setup_logging(level="INFO", log_format="json", stream=output)
+            results["queue_us"] = run(
+                lambda: logger.error(MESSAGE, ERROR), args.lines, args.threads
+            )
+            start = time.perf_counter()
+            stop_logging()
+            results["drain_s"] = round(time.perf_counter() - start, 3)
+            results["dropped"] = handler.dropped
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
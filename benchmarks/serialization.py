@@ -0,0 +1,125 @@
+"""
+Serialization cost of a list payload: the previous format_json() methods
+encoded by Flask's default provider against the precompiled serializers
+encoded by the JSON_BACKEND encoders.
+
+Rows are built in memory (no database needed), the same ones for every
+variant, and each variant is timed `--repeat` times (best run kept).
+
+    DB_PORT=5432 python benchmarks/serialization.py --rows 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from json_provider import encoder  # noqa: E402
+from models import Actor, GenderType, Movie, serialize_actor, serialize_movie  # noqa: E402
+
+
+def legacy_actor_json(actor):
+    ordered_keys = ["id", "name", "age", "gender", "email", "phone", "photo", "seeking_movie"]
+    data = {
+        "id": actor.id,
+        "name": actor.name,
+        "age": actor.age,
+        "gender": str(actor.gender.value),
+        "email": actor.email,
+        "phone": actor.phone,
+        "photo": actor.photo,
+        "seeking_movie": actor.seeking_movie,
+    }
+    return {key: data[key] for key in ordered_keys}
+
+
+def legacy_movie_json(movie):
+    ordered_keys = ["id", "title", "genres", "release_date", "seeking_actor"]
+    data = {
+        "id": movie.id,
+        "title": movie.title,
+        "genres": movie.genres,
+        "release_date": str(movie.release_date),
+        "seeking_actor": movie.seeking_actor,
+    }
+    return {key: data[key] for key in ordered_keys}
+
+
+def make_rows(count):
+    genders = list(GenderType)
+    actors, movies = [], []
+    for index in range(count):
+        actor = Actor(
+            f"Actor {index}",
+            20 + index % 50,
+            genders[index % len(genders)],
+            f"actor{index}@example.com",
+            f"55{index:09d}",
+            f"https://example.com/photos/{index}.jpg",
+            index % 2 == 0,
+        )
+        actor.id = index + 1
+        actors.append(actor)
+        movie = Movie(f"Movie {index}", ["Drama", "Comedy"], datetime(2040, 1, 1), True)
+        movie.id = index + 1
+        movies.append(movie)
+    return actors, movies
+
+
+def best(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return round(min(timings) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    actors, movies = make_rows(args.rows)
+    app = Flask(__name__)
+    flask_json = DefaultJSONProvider(app)
+    backends = ["stdlib"]
+    try:
+        encoder("orjson")
+        backends.append("orjson")
+    except ImportError:
+        pass
+
+    results = {}
+    for name, rows, legacy, serialize in (
+        ("actors", actors, legacy_actor_json, serialize_actor),
+        ("movies", movies, legacy_movie_json, serialize_movie),
+    ):
+        legacy_payload = [legacy(row) for row in rows]
+        payload = list(map(serialize, rows))
+        result = {
+            "legacy_build_ms": best(lambda: [legacy(row) for row in rows], args.repeat),
+            "compiled_build_ms": best(lambda: list(map(serialize, rows)), args.repeat),
+        }
+        with app.app_context():
+            result["flask_encode_ms"] = best(
+                lambda: flask_json.dumps(legacy_payload, separators=(",", ":")),
+                args.repeat,
+            )
+        for backend in backends:
+            encode = encoder(backend)
+            result[f"{backend}_encode_ms"] = best(lambda: encode(payload), args.repeat)
+        results[name] = result
+
+    print(json.dumps({"rows": args.rows, "backends": backends, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
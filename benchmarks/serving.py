@@ -0,0 +1,121 @@
+"""
+Throughput and latency of the serving modes under concurrent requests.
+
+For each WORKER_MODE a gunicorn server is started with gunicorn.conf.py,
+`--requests` GETs are sent to `--path` by `--concurrency` clients, then the
+server is stopped. Needs the database and Auth0 settings of the app and a
+token with the permission of the path.
+
+    PRODUCER_TOKEN=... python benchmarks/serving.py --modes sync threads gevent
+    python benchmarks/serving.py --url http://127.0.0.1:5000  # running server
+
+Use a single worker (default) to compare how much one process can serve.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get(url, token):
+    request = Request(url, headers={"Authorization": f"Bearer {token}"})
+    start = time.perf_counter()
+    try:
+        with urlopen(request, timeout=60) as response:
+            response.read()
+            ok = response.status == 200
+    except (HTTPError, URLError, OSError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def load(url, token, requests, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: get(url, token), range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+    if not latencies:
+        return {"errors": errors}
+    return {
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+        "errors": errors,
+    }
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urlopen(url, timeout=1):
+                return True
+        except (URLError, OSError):
+            time.sleep(0.2)
+    return False
+
+
+def serve(mode, port, workers):
+    env = dict(
+        os.environ,
+        WORKER_MODE=mode,
+        WEB_CONCURRENCY=str(workers),
+        BIND=f"127.0.0.1:{port}",
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["sync", "threads", "gevent"])
+    parser.add_argument("--url", help="benchmark an already running server instead")
+    parser.add_argument("--path", default="/actors?limit=100")
+    parser.add_argument("--token", default=os.getenv("PRODUCER_TOKEN"))
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.url:
+        result = load(args.url + args.path, args.token, args.requests, args.concurrency)
+        print(json.dumps(result, indent=2))
+        return
+
+    results = {}
+    for mode in args.modes:
+        server = serve(mode, args.port, args.workers)
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            if not wait_until_up(base_url + "/"):
+                results[mode] = {"error": "server did not start"}
+                continue
+            results[mode] = load(
+                base_url + args.path, args.token, args.requests, args.concurrency
+            )
+        finally:
+            server.terminate()
+            server.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Startup time of an API worker.
+
+Each run starts a fresh interpreter, like a gunicorn worker boot, and
+measures the import of the app module (which builds the gunicorn app) and
+one more create_app() call. Neither should touch the database.
+
+    python benchmarks/startup.py --runs 20
+    python benchmarks/startup.py --profile          # per module and phase
+    python benchmarks/startup.py --check            # fail on regression
+    python benchmarks/startup.py --update-baseline  # after a wanted change
+
+--check compares the medians with startup_baseline.json and exits with
+status 1 when one of them is more than --tolerance above the baseline.
+Baselines are machine dependent, record them where the check runs.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+PHASES = ("import", "create_app")
+
+WORKER = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({"import": imported - start, "create_app": created - imported}))
+"""
+
+
+def run_worker(profile=False):
+    env = dict(os.environ)
+    command = [sys.executable, "-c", WORKER]
+    if profile:
+        env["STARTUP_PROFILE"] = "1"
+        command[1:1] = ["-X", "importtime"]
+    result = subprocess.run(
+        command, cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    # The app prints while starting, the timings are the last line
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, result.stderr
+
+
+def parse_profile(stderr, top):
+    """
+    (modules, phases): the `top` slowest modules imported by the app,
+    inclusive of their own imports, and the phases reported by the app
+    with STARTUP_PROFILE.
+    """
+    modules, phases = [], []
+    for line in stderr.splitlines():
+        if line.startswith("import time:"):
+            fields = line[len("import time:"):].split("|")
+            if len(fields) != 3 or not fields[0].strip().isdigit():
+                continue
+            name = fields[2].rstrip()
+            depth = (len(name) - len(name.lstrip())) // 2
+            modules.append((int(fields[1]) / 1000, depth, name.strip()))
+        elif line.startswith('{"phase"'):
+            phases.append(json.loads(line))
+    # Direct imports of the worker script and of the app module
+    modules = [module for module in modules if module[1] <= 1]
+    modules.sort(reverse=True)
+    return modules[:top], phases
+
+
+def summary(values):
+    values = sorted(values)
+    return {
+        "median_ms": round(statistics.median(values) * 1000, 2),
+        "p95_ms": round(values[int(0.95 * (len(values) - 1))] * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2),
+    }
+
+
+def check(results, tolerance):
+    """Names of the phases slower than their baseline plus tolerance."""
+    with open(BASELINE) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = []
+    for phase in PHASES:
+        limit = baseline[phase]["median_ms"] * (1 + tolerance)
+        if results[phase]["median_ms"] > limit:
+            print(
+                f"{phase}: {results[phase]['median_ms']}ms > {limit:.2f}ms "
+                f"(baseline {baseline[phase]['median_ms']}ms + {tolerance:.0%})"
+            )
+            regressions.append(phase)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--profile", action="store_true", help="break down one run")
+    parser.add_argument("--top", type=int, default=15, help="modules shown by --profile")
+    parser.add_argument("--check", action="store_true", help="compare with the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if args.profile:
+        timings, stderr = run_worker(profile=True)
+        modules, phases = parse_profile(stderr, args.top)
+        print("Slowest imports (inclusive):")
+        for ms, depth, name in modules:
+            print(f"  {ms:9.2f}ms  {'  ' * depth}{name}")
+        print("Phases:")
+        for phase in phases:
+            print(f"  {phase['ms']:9.2f}ms  {phase['phase']}")
+        return 0
+
+    runs = [run_worker()[0] for _ in range(args.runs)]
+    results = {phase: summary([run[phase] for run in runs]) for phase in PHASES}
+    print(json.dumps({"runs": args.runs, **results}, indent=2))
+
+    if args.update_baseline:
+        with open(BASELINE, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+            baseline_file.write("\n")
+    if args.check and check(results, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+import os
+from datetime import datetime
+from sqlalchemy import func, insert, update, delete, select
+from models import db, bump_table_version, GenderType, Actor, Movie
+from filters import parse_date, build_filter, FilterError
+
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 1000))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", 10000))
+
+ATOMIC = "atomic"
+PARTIAL = "partial"
+
+
+class BulkError(Exception):
+    def __init__(self, message, errors=None, status_code=422):
+        self.message = message
+        self.errors = errors or []
+        self.status_code = status_code
+
+
+def get_bulk_mode(args):
+    mode = args.get("mode", ATOMIC)
+    if mode not in (ATOMIC, PARTIAL):
+        raise BulkError(f"mode must be '{ATOMIC}' or '{PARTIAL}'", status_code=400)
+    return mode
+
+
+def get_bulk_items(data, key):
+    """Items of a bulk body, either a JSON array or {key: [...]}."""
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list) or not data:
+        raise BulkError(f"Expected a non empty array of {key}", status_code=400)
+    if len(data) > BULK_MAX_ITEMS:
+        raise BulkError(
+            f"At most {BULK_MAX_ITEMS} {key} per request", status_code=413
+        )
+    return data
+
+
+def _string(max_length=None):
+    def check(value):
+        if not isinstance(value, str) or not value.strip():
+            return "must be a non empty string"
+        if max_length and len(value) > max_length:
+            return f"must have at most {max_length} characters"
+
+    return check
+
+
+def _positive_integer(value):
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        return "must be a positive integer"
+
+
+def _boolean(value):
+    if not isinstance(value, bool):
+        return "must be a boolean"
+
+
+def _gender(value):
+    if value not in GenderType.__members__:
+        return f"must be one of {', '.join(GenderType.__members__)}"
+
+
+def _genres(value):
+    if (
+        not isinstance(value, list)
+        or not value
+        or not all(isinstance(genre, str) and len(genre) <= 120 for genre in value)
+    ):
+        return "must be a non empty array of strings"
+
+
+def _future_date(value):
+    try:
+        release_date = parse_date(value)
+    except ValueError:
+        return "must be a date (YYYY/MM/DD)"
+    # Same rule as the check_release_date constraint
+    if release_date.date() <= datetime.today().date():
+        return "must be in the future"
+
+
+# Writable fields with their check (returns an error message or None) and
+# the conversion to the column value
+ACTOR_FIELDS = {
+    "name": (_string(), None),
+    "age": (_positive_integer, None),
+    "gender": (_gender, lambda value: GenderType[value]),
+    "email": (_string(120), None),
+    "phone": (_string(120), None),
+    "photo": (_string(600), None),
+    "seeking_movie": (_boolean, None),
+}
+
+MOVIE_FIELDS = {
+    "title": (_string(), None),
+    "genres": (_genres, None),
+    "release_date": (_future_date, parse_date),
+    "seeking_actor": (_boolean, None),
+}
+
+WRITABLE = {Actor: ACTOR_FIELDS, Movie: MOVIE_FIELDS}
+
+
+def validate_fields(item, fields, partial=False):
+    """
+    Check item against fields. With partial=False every field is required,
+    with partial=True only the given ones are checked (updates).
+    Returns (row, errors).
+    """
+    if not isinstance(item, dict):
+        return None, {"item": "must be an object"}
+
+    errors = {}
+    if partial:
+        for field in item:
+            if field not in fields:
+                errors[field] = "is not a writable field"
+    else:
+        for field in fields:
+            if item.get(field) is None:
+                errors[field] = "is required"
+
+    row = {}
+    for field, (check, convert) in fields.items():
+        if field not in item or field in errors:
+            continue
+        error = check(item[field])
+        if error:
+            errors[field] = error
+        else:
+            row[field] = convert(item[field]) if convert else item[field]
+    if errors:
+        return None, errors
+    return row, {}
+
+
+def validate_actor(item):
+    """Returns (row, errors) for one actor of a bulk request."""
+    return validate_fields(item, ACTOR_FIELDS)
+
+
+def validate_movie(item):
+    """Returns (row, errors) for one movie of a bulk request."""
+    return validate_fields(item, MOVIE_FIELDS)
+
+
+def _insert_rows(model, rows):
+    """
+    One multi-row INSERT, returns the ids of rows in order. The ids are taken
+    from the table sequence first and inserted with the rows: Postgres
+    doesn't say in which order RETURNING gives back the rows of a multi-row
+    INSERT.
+    """
+    sequence = func.pg_get_serial_sequence(f'"{model.__tablename__}"', "id")
+    ids = db.session.execute(
+        select(func.nextval(sequence)).select_from(func.generate_series(1, len(rows)))
+    ).scalars().all()
+    statement = insert(model.__table__).values(
+        [dict(row, id=row_id) for row, row_id in zip(rows, ids)]
+    )
+    db.session.execute(statement)
+    return ids
+
+
+def bulk_insert(model, items, validate, mode=ATOMIC):
+    """
+    Validate every item up front, then insert the valid ones in a single
+    transaction.
+
+    In atomic mode any invalid item (or database error) rejects the whole
+    batch with BulkError. In partial mode the invalid items are reported and
+    the others inserted; when the multi-row INSERT hits a constraint the
+    batch is retried row by row inside savepoints to single out the
+    offending rows.
+
+    Returns (created, errors): a list of {"index", "id"} for the new rows
+    and a list of {"index", "errors"} for the rejected ones, where index is
+    the position of the item in the request.
+    """
+    rows, indexes, errors = [], [], []
+    for index, item in enumerate(items):
+        row, item_errors = validate(item)
+        if item_errors:
+            errors.append({"index": index, "errors": item_errors})
+        else:
+            rows.append(row)
+            indexes.append(index)
+
+    if errors and mode == ATOMIC:
+        raise BulkError("Invalid items, nothing was created", errors)
+    if not rows:
+        return [], errors
+
+    created = []
+    try:
+        try:
+            with db.session.begin_nested():
+                ids = _insert_rows(model, rows)
+            created = [{"index": index, "id": row_id} for index, row_id in zip(indexes, ids)]
+        except Exception as error:
+            if mode == ATOMIC:
+                raise BulkError(f"Unable to create the items: {error.__class__.__name__}")
+            for index, row in zip(indexes, rows):
+                try:
+                    with db.session.begin_nested():
+                        created.append(
+                            {"index": index, "id": _insert_rows(model, [row])[0]}
+                        )
+                except Exception as row_error:
+                    message = str(getattr(row_error, "orig", row_error)).strip()
+                    errors.append({"index": index, "errors": {"database": message}})
+        if created:
+            bump_table_version(model.__tablename__)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    errors.sort(key=lambda error: error["index"])
+    return created, errors
+
+
+def get_selection(model, body):
+    """
+    Conditions selecting the rows of a bulk update/delete, given either as
+    {"ids": [...]} or as {"filter": {...}} (see filters.build_filter).
+    """
+    ids = body.get("ids")
+    expression = body.get("filter")
+    if (ids is None) == (expression is None):
+        raise BulkError("Give either 'ids' or 'filter'", status_code=400)
+
+    if ids is not None:
+        if (
+            not isinstance(ids, list)
+            or not ids
+            or not all(isinstance(row_id, int) and not isinstance(row_id, bool) for row_id in ids)
+        ):
+            raise BulkError("ids must be a non empty array of integers", status_code=400)
+        if len(ids) > BULK_MAX_ITEMS:
+            raise BulkError(f"At most {BULK_MAX_ITEMS} ids per request", status_code=413)
+        return [model.id.in_(ids)]
+
+    try:
+        return build_filter(model, expression)
+    except FilterError as error:
+        raise BulkError(str(error), status_code=400)
+
+
+def get_bulk_options(body, args):
+    """(max_rows, dry_run) of a bulk update/delete, from the body or query string."""
+    max_rows = body.get("max_rows", args.get("max_rows", BULK_MAX_ROWS, type=int))
+    if isinstance(max_rows, bool) or not isinstance(max_rows, int) or max_rows < 1:
+        raise BulkError("max_rows must be a positive integer", status_code=400)
+    max_rows = min(max_rows, BULK_MAX_ROWS)
+
+    dry_run = body.get("dry_run", args.get("dry_run", "0").lower() in ("1", "true"))
+    if not isinstance(dry_run, bool):
+        raise BulkError("dry_run must be a boolean", status_code=400)
+    return max_rows, dry_run
+
+
+def parse_bulk_update(model, body, args):
+    """(conditions, changes, max_rows, dry_run) of a bulk update request."""
+    if not isinstance(body, dict):
+        raise BulkError("Expected a JSON object", status_code=400)
+    conditions = get_selection(model, body)
+    max_rows, dry_run = get_bulk_options(body, args)
+    changes = body.get("set")
+    if not isinstance(changes, dict) or not changes:
+        raise BulkError("'set' must change at least one field", status_code=400)
+    changes, errors = validate_fields(changes, WRITABLE[model], partial=True)
+    if errors:
+        raise BulkError("Invalid changes, nothing was changed", [{"errors": errors}])
+    return conditions, changes, max_rows, dry_run
+
+
+def parse_bulk_delete(model, body, args):
+    """(conditions, max_rows, dry_run) of a bulk delete request."""
+    if not isinstance(body, dict):
+        raise BulkError("Expected a JSON object", status_code=400)
+    conditions = get_selection(model, body)
+    max_rows, dry_run = get_bulk_options(body, args)
+    return conditions, max_rows, dry_run
+
+
+def _matching_ids(model, conditions, max_rows, lock=False):
+    statement = select(model.id).where(*conditions).order_by(model.id).limit(max_rows + 1)
+    if lock:
+        statement = statement.with_for_update()
+    return [row_id for (row_id,) in db.session.execute(statement)]
+
+
+def _run_bulk(model, statement, conditions, max_rows, dry_run):
+    """
+    Run statement (UPDATE/DELETE ... RETURNING id) on the rows matching
+    conditions. The matching ids are read (and locked) first, so more than
+    max_rows matches are refused before anything is written.
+    """
+    try:
+        ids = _matching_ids(model, conditions, max_rows, lock=not dry_run)
+    except Exception as error:
+        db.session.rollback()
+        raise BulkError(f"Unable to apply the changes: {error.__class__.__name__}")
+
+    if len(ids) > max_rows:
+        db.session.rollback()
+        raise BulkError(
+            f"The operation affects more than {max_rows} rows, nothing was changed"
+        )
+    if dry_run:
+        db.session.rollback()
+        return ids
+
+    candidates = select(model.id).where(*conditions).order_by(model.id).limit(max_rows)
+    try:
+        ids = [
+            row_id
+            for (row_id,) in db.session.execute(
+                statement.where(model.id.in_(candidates.scalar_subquery()))
+            )
+        ]
+    except Exception as error:
+        db.session.rollback()
+        raise BulkError(f"Unable to apply the changes: {error.__class__.__name__}")
+    if ids:
+        bump_table_version(model.__tablename__)
+    db.session.commit()
+    return sorted(ids)
+
+
+def bulk_update(model, conditions, changes, max_rows=BULK_MAX_ROWS, dry_run=False):
+    """
+    Apply changes to every matching row with one UPDATE ... RETURNING id.
+    Nothing is written (or even locked beyond max_rows + 1 rows) if more
+    than max_rows rows match. With dry_run the
+    ids that would change are returned without touching them.
+    """
+    values = dict(changes, version=model.version + 1)
+    statement = update(model.__table__).values(**values).returning(model.id)
+    return _run_bulk(model, statement, conditions, max_rows, dry_run)
+
+
+def bulk_delete(model, conditions, max_rows=BULK_MAX_ROWS, dry_run=False):
+    """
+    Delete every matching row with one DELETE ... RETURNING id, same
+    limits and dry run as bulk_update.
+    """
+    statement = delete(model.__table__).returning(model.id)
+    return _run_bulk(model, statement, conditions, max_rows, dry_run)
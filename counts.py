@@ -0,0 +1,40 @@
+import os
+from sqlalchemy import func, text
+from models import db
+
+
+COUNT_MODE = os.getenv("COUNT_MODE", "exact")
+
+EXACT = "exact"
+ESTIMATE = "estimate"
+
+
+def exact_count(model):
+    return db.session.query(func.count()).select_from(model).scalar()
+
+
+def estimated_count(model):
+    """
+    Planner estimate from pg_class.reltuples, None when the table was
+    never analyzed.
+    """
+    reltuples = db.session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": f'"{model.__tablename__}"'},
+    ).scalar()
+    if reltuples is None or reltuples < 0:
+        return None
+    return reltuples
+
+
+def table_count(model, mode=None):
+    """
+    Number of rows of model's table without loading them.
+    Returns (count, mode) where mode says which strategy produced it.
+    """
+    mode = mode or COUNT_MODE
+    if mode == ESTIMATE:
+        count = estimated_count(model)
+        if count is not None:
+            return count, ESTIMATE
+    return exact_count(model), EXACT
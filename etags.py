@@ -0,0 +1,90 @@
+import logging
+import hashlib
+from flask import Response
+from sqlalchemy import cast, func
+from sqlalchemy.dialects.postgresql import OID
+from models import db, TableVersion
+
+logger = logging.getLogger(__name__)
+
+
+def table_epoch(table_name):
+    """
+    OID of a table, a new one each time the table is created again
+    (reset-db): ETags carry it so versions starting over from 0 don't give
+    back the ETags of older data.
+    """
+    return cast(func.to_regclass(f'"{table_name}"'), OID)
+
+
+def table_version(model):
+    """
+    (epoch, change version) of model's table, the version is 0 if the
+    table was never written by the API.
+    """
+    version = (
+        db.session.query(TableVersion.version)
+        .filter(TableVersion.table_name == model.__tablename__)
+        .scalar_subquery()
+    )
+    epoch, version = db.session.query(
+        table_epoch(TableVersion.__tablename__), version
+    ).one()
+    return epoch, version or 0
+
+
+def row_version(model, row_id):
+    """(epoch, version) of one row, None when it doesn't exist."""
+    return (
+        db.session.query(table_epoch(model.__tablename__), model.version)
+        .filter(model.id == row_id)
+        .one_or_none()
+    )
+
+
+def list_etag(model, request, variant=None):
+    """
+    ETag of a list response: the table epoch and version plus the query
+    string (and response variant), as each page of the same table version
+    is a different body. None if the version can't be read, the request
+    then goes on without conditional handling.
+    """
+    try:
+        epoch, version = table_version(model)
+    except Exception as error:
+        db.session.rollback()
+        logger.error("Unable to read %s version: %s", model.__tablename__, error)
+        return None
+    key = request.query_string + str(variant).encode("utf-8")
+    args = hashlib.sha1(key).hexdigest()[:12]
+    return f"{model.__tablename__.lower()}-{epoch}-v{version}-{args}"
+
+
+def row_etag(model, row_id):
+    """ETag of a single row, None if it doesn't exist or can't be read."""
+    try:
+        row = row_version(model, row_id)
+    except Exception as error:
+        db.session.rollback()
+        logger.error("Unable to read %s %s version: %s", model.__tablename__, row_id, error)
+        return None
+    if row is None:
+        return None
+    epoch, version = row
+    return f"{model.__tablename__.lower()}-{epoch}-{row_id}-v{version}"
+
+
+def is_fresh(etag, request):
+    return etag is not None and etag in request.if_none_match
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def with_etag(response, etag):
+    if etag is not None:
+        response.set_etag(etag)
+    return response
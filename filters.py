@@ -0,0 +1,193 @@
+from datetime import datetime
+from models import Actor, Movie, GenderType
+
+
+class FilterError(ValueError):
+    pass
+
+
+def parse_date(value):
+    """Dates are accepted as YYYY/MM/DD, YYYY.MM.DD or ISO 8601."""
+    text = str(value)
+    date, separator, time = text.partition("T" if "T" in text else " ")
+    normalized = date.replace("/", "-").replace(".", "-") + separator + time
+    return datetime.fromisoformat(normalized)
+
+
+def _boolean(value):
+    if not isinstance(value, bool):
+        raise FilterError("must be a boolean")
+    return value
+
+
+def _integer(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise FilterError("must be an integer")
+    return value
+
+
+def _string(value):
+    if not isinstance(value, str):
+        raise FilterError("must be a string")
+    return value
+
+
+def _gender(value):
+    if value not in GenderType.__members__:
+        raise FilterError(f"must be one of {', '.join(GenderType.__members__)}")
+    return GenderType[value]
+
+
+def _date(value):
+    try:
+        return parse_date(value)
+    except ValueError:
+        raise FilterError("must be a date (YYYY/MM/DD)")
+
+
+# Columns that can be used in a filter expression, with the function that
+# checks and converts a JSON value for them
+FILTERABLE = {
+    Actor: {
+        "id": _integer,
+        "name": _string,
+        "age": _integer,
+        "gender": _gender,
+        "seeking_movie": _boolean,
+    },
+    Movie: {
+        "id": _integer,
+        "title": _string,
+        "release_date": _date,
+        "seeking_actor": _boolean,
+    },
+}
+
+OPERATORS = {
+    "eq": lambda column, value: column == value,
+    "ne": lambda column, value: column != value,
+    "lt": lambda column, value: column < value,
+    "lte": lambda column, value: column <= value,
+    "gt": lambda column, value: column > value,
+    "gte": lambda column, value: column >= value,
+    "in": lambda column, value: column.in_(value),
+}
+
+
+def build_filter(model, expression):
+    """
+    Turn a JSON filter expression into a list of SQLAlchemy conditions, all
+    of them must match. Each field maps either to a value (equality) or to
+    an object of operators:
+
+        {"gender": "female", "age": {"gte": 20, "lte": 30}, "id": {"in": [1, 2]}}
+
+    Raises FilterError on unknown fields, operators or badly typed values.
+    """
+    if not isinstance(expression, dict) or not expression:
+        raise FilterError("filter must be a non empty object")
+
+    columns = FILTERABLE[model]
+    conditions = []
+    for field, condition in expression.items():
+        if field not in columns:
+            raise FilterError(f"Unknown filter field '{field}'")
+        convert = columns[field]
+        column = getattr(model, field)
+        if not isinstance(condition, dict):
+            condition = {"eq": condition}
+        for operator, value in condition.items():
+            if operator not in OPERATORS:
+                raise FilterError(f"Unknown filter operator '{operator}'")
+            try:
+                if operator == "in":
+                    if not isinstance(value, list) or not value:
+                        raise FilterError("must be a non empty array")
+                    value = [convert(item) for item in value]
+                else:
+                    value = convert(value)
+            except FilterError as error:
+                raise FilterError(f"{field}.{operator} {error}")
+            conditions.append(OPERATORS[operator](column, value))
+    return conditions
+
+
+GENRE_MATCHES = ("any", "all")
+
+
+def _arg(args, name, convert):
+    """Converted query string argument, None when it is not given."""
+    value = args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return convert(value)
+    except (FilterError, ValueError):
+        raise FilterError(f"Invalid value for {name}: '{value}'")
+
+
+def _arg_boolean(value):
+    if value.lower() in ("1", "true"):
+        return True
+    if value.lower() in ("0", "false"):
+        return False
+    raise FilterError("must be a boolean")
+
+
+def _range(column, minimum, maximum):
+    conditions = []
+    if minimum is not None:
+        conditions.append(column >= minimum)
+    if maximum is not None:
+        conditions.append(column <= maximum)
+    return conditions
+
+
+def actor_filters(args):
+    """
+    Conditions of the GET /actors query string: `gender`, `min_age`,
+    `max_age` (inclusive) and `seeking_movie`. Raises FilterError on bad
+    arguments.
+    """
+    conditions = []
+    gender = _arg(args, "gender", _gender)
+    if gender is not None:
+        conditions.append(Actor.gender == gender)
+    conditions.extend(
+        _range(Actor.age, _arg(args, "min_age", int), _arg(args, "max_age", int))
+    )
+    seeking_movie = _arg(args, "seeking_movie", _arg_boolean)
+    if seeking_movie is not None:
+        conditions.append(Actor.seeking_movie == seeking_movie)
+    return conditions
+
+
+def movie_filters(args):
+    """
+    Conditions of the GET /movies query string. `genre` can be repeated,
+    with `genre_match=any` (default, array overlap) or `genre_match=all`
+    (array containment), both served by the GIN index on Movie.genres.
+    `seeking_actor`, `release_date_from` and `release_date_to` (inclusive)
+    filter on the other columns. Raises FilterError on bad arguments.
+    """
+    conditions = []
+    genres = [genre for genre in args.getlist("genre") if genre]
+    match = args.get("genre_match", "any")
+    if match not in GENRE_MATCHES:
+        raise FilterError(f"genre_match must be one of {', '.join(GENRE_MATCHES)}")
+    if genres:
+        if match == "all":
+            conditions.append(Movie.genres.contains(genres))
+        else:
+            conditions.append(Movie.genres.overlap(genres))
+    seeking_actor = _arg(args, "seeking_actor", _arg_boolean)
+    if seeking_actor is not None:
+        conditions.append(Movie.seeking_actor == seeking_actor)
+    conditions.extend(
+        _range(
+            Movie.release_date,
+            _arg(args, "release_date_from", _date),
+            _arg(args, "release_date_to", _date),
+        )
+    )
+    return conditions
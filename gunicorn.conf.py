@@ -0,0 +1,71 @@
+"""
+Gunicorn settings, loaded by `gunicorn app:app` from the project root.
+
+WORKER_MODE picks how a worker serves concurrent requests, the routes are
+the same in every mode:
+
+- sync (default): one request at a time per worker.
+- threads: WORKER_THREADS requests per worker on threads.
+- gevent: up to WORKER_CONNECTIONS requests per worker on greenlets. The
+  standard library (JWKS fetch included) is monkey patched by the worker
+  and psycopg2 waits cooperatively, so slow database or Auth0 round trips
+  don't hold the worker. Needs the gevent package (in requirements.txt).
+"""
+import os
+import glob
+import importlib.util
+import multiprocessing
+
+
+WORKER_MODE = os.getenv("WORKER_MODE", "sync")
+WORKER_CLASSES = {"sync": "sync", "threads": "gthread", "gevent": "gevent"}
+if WORKER_MODE not in WORKER_CLASSES:
+    raise ValueError(f"WORKER_MODE must be one of {', '.join(WORKER_CLASSES)}")
+if WORKER_MODE == "gevent" and importlib.util.find_spec("gevent") is None:
+    raise RuntimeError("WORKER_MODE=gevent needs the gevent package: pip install gevent")
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', 8000)}")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = WORKER_CLASSES[WORKER_MODE]
+threads = int(os.getenv("WORKER_THREADS", 8)) if WORKER_MODE == "threads" else 1
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", 1000))
+timeout = int(os.getenv("WORKER_TIMEOUT", 30))
+
+
+def _gevent_wait_callback(connection, timeout=None):
+    """psycopg2 wait callback yielding to the gevent hub while waiting on I/O."""
+    from psycopg2 import extensions, OperationalError
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(connection.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(connection.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+
+def on_starting(server):
+    # Metrics of the previous run of the server
+    if os.getenv("METRICS_DIR"):
+        for path in glob.glob(os.path.join(os.getenv("METRICS_DIR"), "metrics-*.json")):
+            os.remove(path)
+
+
+def post_fork(server, worker):
+    if WORKER_MODE == "gevent":
+        from psycopg2 import extensions
+
+        extensions.set_wait_callback(_gevent_wait_callback)
+        server.log.info("Worker %s: psycopg2 is cooperative", worker.pid)
+
+
+def worker_exit(server, worker):
+    # Requests of the last flush interval, the worker file is all that's left
+    from metrics import request_metrics
+
+    request_metrics.flush(force=True)
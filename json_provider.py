@@ -0,0 +1,97 @@
+import os
+import json
+import enum
+from datetime import date
+from flask.json.provider import DefaultJSONProvider, _default
+
+
+# auto (orjson when it is installed), orjson or stdlib
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+
+
+def default(value):
+    """Types the encoders don't know: Enum members give their value, dates
+    their str() (the format of the model payloads), then Flask's rules."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, date):
+        return str(value)
+    return _default(value)
+
+
+def stdlib_encoder(sort_keys=False, indent=None):
+    separators = (",", ":") if indent is None else None
+    options = dict(
+        default=default,
+        ensure_ascii=False,
+        sort_keys=sort_keys,
+        indent=indent,
+        separators=separators,
+    )
+    return lambda obj: json.dumps(obj, **options).encode("utf-8")
+
+
+def orjson_encoder(sort_keys=False, indent=None):
+    import orjson
+
+    # Datetimes go through default too, so both backends give the same text
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent is not None:
+        option |= orjson.OPT_INDENT_2
+    return lambda obj: orjson.dumps(obj, default=default, option=option)
+
+
+def encoder(backend=JSON_BACKEND, sort_keys=False, indent=None):
+    """Function encoding an object to UTF-8 JSON bytes with backend."""
+    if backend == "auto":
+        try:
+            return orjson_encoder(sort_keys, indent)
+        except ImportError:
+            return stdlib_encoder(sort_keys, indent)
+    if backend == "orjson":
+        return orjson_encoder(sort_keys, indent)
+    if backend == "stdlib":
+        return stdlib_encoder(sort_keys, indent)
+    raise ValueError("JSON_BACKEND must be one of auto, orjson, stdlib")
+
+
+encode_json = encoder()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider encoding straight to bytes with the JSON_BACKEND encoder
+    (orjson when available). Keys keep the order the payloads are built
+    in, set `app.json.sort_keys = True` to sort them.
+    """
+
+    sort_keys = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.backend = app.config.get("JSON_BACKEND", JSON_BACKEND)
+        self._encoders = {}
+
+    def _encoder(self, indent=None):
+        key = (self.sort_keys, indent)
+        if key not in self._encoders:
+            self._encoders[key] = encoder(self.backend, self.sort_keys, indent)
+        return self._encoders[key]
+
+    def encode(self, obj, indent=None):
+        return self._encoder(indent)(obj)
+
+    def dumps(self, obj, **kwargs):
+        # Arguments only json.dumps understands (cls, ...) keep Flask's path
+        if set(kwargs) - {"indent"}:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj, kwargs.get("indent")).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            self.encode(obj, 2 if pretty else None) + b"\n", mimetype=self.mimetype
+        )
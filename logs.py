@@ -0,0 +1,191 @@
+import os
+import re
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from flask import has_request_context, request
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# json (one object per line) or text
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# Share of the records below WARNING kept per endpoint, e.g.
+# "retrieve_actors=0.01,retrieve_movies=0.1"
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+REDACTED = "[REDACTED]"
+SENSITIVE_KEYS = {
+    "authorization",
+    "access_token",
+    "id_token",
+    "token",
+    "payload",
+    "password",
+    "secret",
+    "cookie",
+}
+_JWT = re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]*")
+_BEARER = re.compile(r"(?i)\bbearer\s+\S+")
+
+
+def parse_sampling(value):
+    """{"endpoint": rate} of a LOG_SAMPLING value."""
+    rates = {}
+    for pair in value.split(","):
+        endpoint, _, rate = pair.partition("=")
+        if endpoint.strip() and rate.strip():
+            rates[endpoint.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+def redact(value):
+    """Tokens and auth fields of value replaced by [REDACTED]."""
+    if isinstance(value, str):
+        return _BEARER.sub(f"Bearer {REDACTED}", _JWT.sub(REDACTED, value))
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in SENSITIVE_KEYS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class RequestContextFilter(logging.Filter):
+    """Tags records with the request they were logged from."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.endpoint = request.endpoint
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a share of the records below WARNING of the sampled endpoints."""
+
+    def __init__(self, rates, draw=random.random):
+        super().__init__()
+        self.rates = rates
+        self.draw = draw
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "endpoint", None))
+        return rate is None or self.draw() < rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks the request: records are dropped when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The listener formats the record, only the arguments are merged
+        # here (they may change once the request moves on). Unlike the
+        # stdlib handler, no formatting and no copy on the request thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, structured fields given as extra={"data": {...}}."""
+
+    CONTEXT = ("endpoint", "method", "path")
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        for field in self.CONTEXT:
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = redact(record.exc_text)
+        entry.update(redact(getattr(record, "data", None) or {}))
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        return redact(super().format(record))
+
+
+_handler = None
+_listener = None
+_pid = None
+
+
+def setup_logging(
+    level=LOG_LEVEL, log_format=LOG_FORMAT, sampling=LOG_SAMPLING, stream=None
+):
+    """
+    Route every logger to a queue emptied by a background thread, which
+    formats, redacts and writes the records. Request threads only filter
+    and enqueue. Once per process (each gunicorn worker has its own
+    listener thread).
+    """
+    global _handler, _listener, _pid
+    if _pid == os.getpid():
+        return _handler
+    stop_logging()
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JSONFormatter() if log_format == "json" else TextFormatter())
+
+    handler = DroppingQueueHandler(log_queue)
+    # In this order: sampling needs the endpoint set by the context filter
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(SamplingFilter(parse_sampling(sampling)))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+
+    _handler, _pid = handler, os.getpid()
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    return handler
+
+
+def stop_logging():
+    """Write the queued records and detach the handler of setup_logging."""
+    global _handler, _listener, _pid
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+    # A forked worker inherits the handler but not the listener thread
+    if _listener is not None and _pid == os.getpid():
+        _listener.stop()
+    _handler = _listener = _pid = None
+
+
+atexit.register(stop_logging)
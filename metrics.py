@@ -0,0 +1,412 @@
+import logging
+import os
+import re
+import fcntl
+import glob
+import json
+import bisect
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from json_provider import FastJSONProvider
+
+logger = logging.getLogger(__name__)
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Directory shared by the workers of a server, each one writes its metrics
+# there and GET /metrics adds them up. Unset, a worker only reports its own.
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1))
+
+REQUEST_PHASES = ("auth", "db", "serialization", "app")
+
+# Metrics of the exited workers, added up in one file
+EXITED_WORKERS_FILE = "metrics-exited.json"
+WORKER_FILE_PATTERN = re.compile(r"metrics-(\d+)-\d+\.json$")
+
+
+class Histogram:
+    """Cumulative-friendly histogram: per bucket counts, plus count and sum."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        """{"buckets": {upper bound: cumulative count}, "count", "sum"}."""
+        with self._lock:
+            counts = list(self._counts)
+            total, value_sum = self.count, self.sum
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"buckets": buckets, "count": total, "sum": round(value_sum, 6)}
+
+
+class PoolMetrics:
+    """
+    Connection pool metrics of one worker, fed by the pool events
+    (checkout, checkin, connect, invalidate) and by TimedQueuePool for the
+    time spent waiting for a connection.
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.wait_time = Histogram()
+        self.checked_out_histogram = Histogram(buckets=(1, 2, 5, 10, 20, 50, 100))
+        self.overflow_histogram = Histogram(buckets=(0, 1, 2, 5, 10, 20, 50))
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.max_checked_out = 0
+        self._lock = threading.Lock()
+
+    def instrument(self, engine):
+        """Record the pool of engine, the last instrumented one is reported."""
+        pool = self.pool = engine.pool
+
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self._on_checkout(pool)
+
+        event.listen(engine, "checkout", on_checkout)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_checkout(self, pool):
+        checked_out = pool.checkedout()
+        with self._lock:
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, checked_out)
+        self.checked_out_histogram.observe(checked_out)
+        self.overflow_histogram.observe(max(pool.overflow(), 0))
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self):
+        if self.pool is None:
+            return {}
+        pool = {
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "max_checked_out": self.max_checked_out,
+            "checked_out_histogram": self.checked_out_histogram.snapshot(),
+            "overflow_histogram": self.overflow_histogram.snapshot(),
+            "wait_time_seconds": self.wait_time.snapshot(),
+        }
+        if isinstance(self.pool, QueuePool):
+            pool.update(
+                size=self.pool.size(),
+                checked_out=self.pool.checkedout(),
+                checked_in=self.pool.checkedin(),
+                overflow=max(self.pool.overflow(), 0),
+            )
+        return pool
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.wait_time.observe(time.perf_counter() - start)
+
+
+def merge_histograms(snapshots):
+    merged = {"buckets": {}, "count": 0, "sum": 0.0}
+    for snapshot in snapshots:
+        for bound, count in snapshot["buckets"].items():
+            merged["buckets"][bound] = merged["buckets"].get(bound, 0) + count
+        merged["count"] += snapshot["count"]
+        merged["sum"] += snapshot["sum"]
+    return merged
+
+
+def merge_snapshots(snapshots):
+    """One snapshot adding up the counters and histograms of snapshots."""
+    requests, durations, phases, counters = {}, {}, {}, {}
+    for snapshot in snapshots:
+        for *key, count in snapshot["requests"]:
+            requests[tuple(key)] = requests.get(tuple(key), 0) + count
+        for name, count in snapshot.get("counters", []):
+            counters[name] = counters.get(name, 0) + count
+        for merged, name in ((durations, "durations"), (phases, "phases")):
+            for *key, histogram in snapshot[name]:
+                merged.setdefault(tuple(key), []).append(histogram)
+    return {
+        "requests": [list(key) + [count] for key, count in requests.items()],
+        "durations": [list(key) + [merge_histograms(h)] for key, h in durations.items()],
+        "phases": [list(key) + [merge_histograms(h)] for key, h in phases.items()],
+        "counters": [[name, count] for name, count in counters.items()],
+    }
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _labels(**labels):
+    pairs = ",".join(f'{name}="{value}"' for name, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _render_histogram(lines, name, labels, snapshot):
+    for bound, count in snapshot["buckets"].items():
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {round(snapshot['sum'], 6)}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+
+
+class RequestMetrics:
+    """
+    Request counts by endpoint, method and status, latency histograms by
+    endpoint and method, and by endpoint and phase: auth (token checks), db
+    (statements), serialization (JSON encoding) and app (the rest).
+
+    Other counters of the worker (the caches hits and misses) are added
+    with add_counter() and read at every snapshot.
+
+    With a directory, every worker writes its snapshot to its own file
+    (at most every flush_interval seconds, and once more when it exits) and
+    collect() adds up the files of every worker, the ones of exited workers
+    included (folded in one file) so counters never go down.
+    """
+
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.requests = {}
+        self.durations = {}
+        self.phases = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._path = None
+        self._flushed_at = 0.0
+
+    def observe(self, endpoint, method, status, duration, phases):
+        with self._lock:
+            key = (endpoint, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.durations.setdefault((endpoint, method), Histogram())
+            phase_histograms = [
+                (self.phases.setdefault((endpoint, phase), Histogram()), seconds)
+                for phase, seconds in phases.items()
+            ]
+        histogram.observe(duration)
+        for phase_histogram, seconds in phase_histograms:
+            phase_histogram.observe(seconds)
+
+    def add_counter(self, name, description, read):
+        """Report read(), a counter of this worker, as name."""
+        with self._lock:
+            self.counters[name] = (description, read)
+
+    def snapshot(self):
+        with self._lock:
+            requests = list(self.requests.items())
+            durations = list(self.durations.items())
+            phases = list(self.phases.items())
+            counters = list(self.counters.items())
+        return {
+            "requests": [list(key) + [count] for key, count in requests],
+            "durations": [list(key) + [histogram.snapshot()] for key, histogram in durations],
+            "phases": [list(key) + [histogram.snapshot()] for key, histogram in phases],
+            "counters": [[name, read()] for name, (_, read) in counters],
+        }
+
+    def _worker_path(self):
+        # One file per worker process, also when the app was loaded before
+        # the workers were forked
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._path = os.path.join(
+                self.directory, f"metrics-{self._pid}-{time.time_ns()}.json"
+            )
+        return self._path
+
+    def flush(self, force=False):
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < self.flush_interval:
+            return
+        self._flushed_at = now
+        path = self._worker_path()
+        try:
+            with open(path + ".tmp", "w") as metrics_file:
+                json.dump(self.snapshot(), metrics_file)
+            os.replace(path + ".tmp", path)
+        except OSError as error:
+            logger.error("Unable to write metrics to %s: %s", path, error)
+
+    def _read(self, path):
+        try:
+            with open(path) as metrics_file:
+                return json.load(metrics_file)
+        except (OSError, ValueError) as error:
+            logger.warning("Unable to read metrics from %s: %s", path, error)
+            return None
+
+    def _fold_exited_workers(self):
+        # Recycled workers would otherwise leave a file behind each
+        exited = []
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            match = WORKER_FILE_PATTERN.search(path)
+            if match and not _process_exists(int(match.group(1))):
+                exited.append(path)
+        if not exited:
+            return
+        total = os.path.join(self.directory, EXITED_WORKERS_FILE)
+        paths = ([total] if os.path.exists(total) else []) + exited
+        snapshots = [snapshot for snapshot in map(self._read, paths) if snapshot]
+        try:
+            with open(total + ".tmp", "w") as metrics_file:
+                json.dump(merge_snapshots(snapshots), metrics_file)
+            os.replace(total + ".tmp", total)
+            for path in exited:
+                os.remove(path)
+        except OSError as error:
+            logger.error("Unable to write metrics to %s: %s", total, error)
+
+    def collect(self):
+        """
+        Snapshot of every worker (or of this one without a directory). The
+        files of the exited workers are first added up in
+        EXITED_WORKERS_FILE, under a lock shared by the workers.
+        """
+        if not self.directory:
+            return self.snapshot()
+        self.flush(force=True)
+        with open(os.path.join(self.directory, "metrics.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._fold_exited_workers()
+            paths = glob.glob(os.path.join(self.directory, "metrics-*.json"))
+            snapshots = [snapshot for snapshot in map(self._read, paths) if snapshot]
+        return merge_snapshots(snapshots)
+
+    def render(self):
+        """The collected metrics in the Prometheus text format."""
+        collected = self.collect()
+        lines = [
+            "# HELP http_requests_total Requests by endpoint, method and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for endpoint, method, status, count in sorted(collected["requests"]):
+            labels = _labels(endpoint=endpoint, method=method, status=status)
+            lines.append(f"http_requests_total{labels} {count}")
+        lines += [
+            "# HELP http_request_duration_seconds Request latency by endpoint and method.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for endpoint, method, snapshot in sorted(collected["durations"], key=lambda row: row[:2]):
+            _render_histogram(
+                lines,
+                "http_request_duration_seconds",
+                {"endpoint": endpoint, "method": method},
+                snapshot,
+            )
+        lines += [
+            "# HELP http_request_phase_seconds Request latency by endpoint and phase.",
+            "# TYPE http_request_phase_seconds histogram",
+        ]
+        for endpoint, phase, snapshot in sorted(collected["phases"], key=lambda row: row[:2]):
+            _render_histogram(
+                lines,
+                "http_request_phase_seconds",
+                {"endpoint": endpoint, "phase": phase},
+                snapshot,
+            )
+        descriptions = {name: description for name, (description, _) in self.counters.items()}
+        for name, count in sorted(collected["counters"]):
+            lines += [
+                f"# HELP {name} {descriptions.get(name, name)}",
+                f"# TYPE {name} counter",
+                f"{name} {count}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+def add_phase_time(phase, seconds):
+    """
+    Add seconds to a phase of the current request, if any. The db phase is
+    fed by the statement accounting of queries.py.
+    """
+    if has_request_context():
+        name = f"{phase}_seconds"
+        setattr(g, name, g.get(name, 0.0) + seconds)
+
+
+class TimedJSONProvider(FastJSONProvider):
+    """Fast JSON provider, timing the encoding as the serialization phase."""
+
+    def encode(self, obj, indent=None):
+        start = time.perf_counter()
+        try:
+            return super().encode(obj, indent)
+        finally:
+            add_phase_time("serialization", time.perf_counter() - start)
+
+
+def setup_request_metrics(app, metrics=request_metrics):
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        if "request_start" not in g:
+            return response
+        duration = time.perf_counter() - g.request_start
+        phases = {
+            phase: g.get(f"{phase}_seconds", 0.0) for phase in REQUEST_PHASES[:-1]
+        }
+        phases["app"] = max(duration - sum(phases.values()), 0.0)
+        metrics.observe(
+            request.endpoint or "unmatched",
+            request.method,
+            response.status_code,
+            duration,
+            phases,
+        )
+        metrics.flush()
+        return response
@@ -0,0 +1,29 @@
+"""keyset pagination indexes
+
+Composite indexes used by the cursor pagination of GET /actors and
+GET /movies. Applies on top of the schema in castingAgency.psql.
+
+Revision ID: 4b1f0c2d9a10
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b1f0c2d9a10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE INDEX IF NOT EXISTS ix_actors_name_id ON "Actors" (name, id)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_movies_title_id ON "Movies" (title, id)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_movies_title_id')
+    op.execute('DROP INDEX IF EXISTS ix_actors_name_id')
@@ -0,0 +1,35 @@
+"""table and row versions
+
+Per-table change counters and per-row version columns used to build the
+ETags of the read endpoints.
+
+Revision ID: 7c2e9d4a51b3
+Revises: 4b1f0c2d9a10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e9d4a51b3'
+down_revision = '4b1f0c2d9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        'CREATE TABLE IF NOT EXISTS "TableVersions" ('
+        'table_name VARCHAR(120) NOT NULL PRIMARY KEY, '
+        'version BIGINT NOT NULL)'
+    )
+    op.execute('ALTER TABLE "Actors" ADD COLUMN IF NOT EXISTS version INTEGER DEFAULT 1 NOT NULL')
+    op.execute('ALTER TABLE "Movies" ADD COLUMN IF NOT EXISTS version INTEGER DEFAULT 1 NOT NULL')
+
+
+def downgrade():
+    op.execute('ALTER TABLE "Movies" DROP COLUMN IF EXISTS version')
+    op.execute('ALTER TABLE "Actors" DROP COLUMN IF EXISTS version')
+    op.execute('DROP TABLE IF EXISTS "TableVersions"')
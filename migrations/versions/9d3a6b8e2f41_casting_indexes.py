@@ -0,0 +1,29 @@
+"""casting indexes
+
+Index the Casting foreign keys in both directions for the casting
+endpoints.
+
+Revision ID: 9d3a6b8e2f41
+Revises: 7c2e9d4a51b3
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3a6b8e2f41'
+down_revision = '7c2e9d4a51b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE INDEX IF NOT EXISTS ix_casting_movie_actor ON "Casting" (movie_id, actor_id)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_casting_actor_movie ON "Casting" (actor_id, movie_id)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_casting_actor_movie')
+    op.execute('DROP INDEX IF EXISTS ix_casting_movie_actor')
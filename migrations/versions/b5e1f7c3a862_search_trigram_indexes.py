@@ -0,0 +1,30 @@
+"""search trigram indexes
+
+Trigram GIN indexes on actor names and movie titles for the search
+endpoints (ILIKE '%q%' and similarity matches).
+
+Revision ID: b5e1f7c3a862
+Revises: 9d3a6b8e2f41
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1f7c3a862'
+down_revision = '9d3a6b8e2f41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_actors_name_trgm ON "Actors" USING gin (name gin_trgm_ops)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_movies_title_trgm ON "Movies" USING gin (title gin_trgm_ops)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_movies_title_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_actors_name_trgm')
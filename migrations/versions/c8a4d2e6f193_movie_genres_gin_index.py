@@ -0,0 +1,26 @@
+"""movie genres gin index
+
+GIN index on Movies.genres for the genre filters (@> and && operators).
+
+Revision ID: c8a4d2e6f193
+Revises: b5e1f7c3a862
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8a4d2e6f193'
+down_revision = 'b5e1f7c3a862'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE INDEX IF NOT EXISTS ix_movies_genres ON "Movies" USING gin (genres)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_movies_genres')
@@ -0,0 +1,32 @@
+"""actor and movie filter indexes
+
+Partial index of the actors seeking a movie in page order, composite
+(gender, age) index for the actor filters and release_date index for the
+movie date range filter.
+
+Revision ID: d3f9b1a7c524
+Revises: c8a4d2e6f193
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f9b1a7c524'
+down_revision = 'c8a4d2e6f193'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE INDEX IF NOT EXISTS ix_actors_seeking_movie_name_id ON "Actors" (name, id) WHERE seeking_movie')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_actors_gender_age ON "Actors" (gender, age)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_movies_release_date ON "Movies" (release_date)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_movies_release_date')
+    op.execute('DROP INDEX IF EXISTS ix_actors_gender_age')
+    op.execute('DROP INDEX IF EXISTS ix_actors_seeking_movie_name_id')
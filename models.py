@@ -1,4 +1,5 @@
 import os
+import sys
 import enum
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import (
@@ -8,12 +9,19 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     DateTime,
-    ARRAY,
     CheckConstraint,
     Enum,
+    Index,
+    BigInteger,
+    literal_column,
+    text,
 )
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import relationship
-from flask_migrate import Migrate
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from metrics import TimedQueuePool, pool_metrics
+from replicas import RoutingSession, setup_replicas
+from serializers import compile_serializer
 from datetime import datetime
 
 
@@ -23,25 +31,55 @@ DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
 database_path = "postgresql://{}:{}@localhost:{}/{}".format(DB_USERNAME, DB_PASSWORD, DB_PORT, DB_NAME)
-print(f"models -> database_path: {database_path}")
 
-db = SQLAlchemy()
-migrate = Migrate()
+# Connection pool of each worker
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true")
+# Milliseconds, 0 disables it
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", 30000))
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+def bump_table_version(table_name):
+    """
+    Increment the change version of table_name in the current transaction.
+    Every write has to call it so the list ETags change with the data.
+    """
+    statement = pg_insert(TableVersion).values(table_name=table_name, version=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[TableVersion.table_name],
+        set_={"version": TableVersion.version + 1},
+    )
+    db.session.execute(statement)
 
 
 class DbTransactions:
     def insert(self):
         db.session.add(self)
+        bump_table_version(self.__tablename__)
         db.session.commit()
 
     def update(self):
+        bump_table_version(self.__tablename__)
         db.session.commit()
 
     def delete(self):
         db.session.delete(self)
+        bump_table_version(self.__tablename__)
         db.session.commit()
 
 
+class TableVersion(db.Model):
+    __tablename__ = "TableVersions"
+
+    table_name = Column(String(120), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
 class GenderType(enum.Enum):
     male = "male"
     female = "female"
@@ -62,6 +100,11 @@ class Movie(db.Model, DbTransactions):
     genres = Column(ARRAY(String(120)), nullable=False)
     release_date = Column(DateTime, default=datetime.now)
     seeking_actor = Column(Boolean, nullable=False, default=True)
+    # Incremented in SQL by every UPDATE, used for the row ETag (no
+    # optimistic locking, concurrent writes still go through)
+    version = Column(
+        Integer, nullable=False, server_default="1", onupdate=literal_column("version") + 1
+    )
     movie_castings = relationship("Casting", back_populates="movie_cast")
 
     __table_args__ = (
@@ -69,6 +112,12 @@ class Movie(db.Model, DbTransactions):
             release_date > datetime.today().strftime("%Y/%m/%d"),
             name="check_release_date",
         ),
+        # Keyset pagination over (title, id)
+        Index("ix_movies_title_id", "title", "id"),
+        # Genre filters (@> and && operators)
+        Index("ix_movies_genres", "genres", postgresql_using="gin"),
+        # Release date range filters
+        Index("ix_movies_release_date", "release_date"),
         {},
     )
 
@@ -78,21 +127,8 @@ class Movie(db.Model, DbTransactions):
         self.release_date = release_date
         self.seeking_actor = seeking_actor
 
-    # TODO Rever função
     def format_json(self):
-        ordered_keys = ["id", "title", "genres", "release_date", "seeking_actor"]
-
-        data = {
-            "id": self.id,
-            "title": self.title,
-            "genres": self.genres,
-            "release_date": str(self.release_date),
-            "seeking_actor": self.seeking_actor,
-        }
-
-        ordered_data = {key: data[key] for key in ordered_keys}
-
-        return ordered_data
+        return serialize_movie(self)
 
     def __repr__(self):
         return f"""Movie: {self.id}, {self.title} ({self.genres}),
@@ -111,9 +147,28 @@ class Actor(db.Model, DbTransactions):
     phone = Column(String(120), unique=True, nullable=False)
     photo = Column(String(600), nullable=False)  # TODO Add checagem de link
     seeking_movie = Column(Boolean, nullable=False, default=False)
+    # Incremented in SQL by every UPDATE, used for the row ETag (no
+    # optimistic locking, concurrent writes still go through)
+    version = Column(
+        Integer, nullable=False, server_default="1", onupdate=literal_column("version") + 1
+    )
     actor_castings = relationship("Casting", back_populates="actor_cast")
 
-    __table_args__ = (CheckConstraint(age > 0, name="check_valid_age"), {})
+    __table_args__ = (
+        CheckConstraint(age > 0, name="check_valid_age"),
+        # Keyset pagination over (name, id)
+        Index("ix_actors_name_id", "name", "id"),
+        # Actors seeking a movie, in page order
+        Index(
+            "ix_actors_seeking_movie_name_id",
+            "name",
+            "id",
+            postgresql_where=seeking_movie,
+        ),
+        # Gender and age range filters
+        Index("ix_actors_gender_age", "gender", "age"),
+        {},
+    )
 
     def __init__(self, name, age, gender, email, phone, photo, seeking_movie):
         self.name = name
@@ -125,32 +180,7 @@ class Actor(db.Model, DbTransactions):
         self.seeking_movie = seeking_movie
 
     def format_json(self):
-
-        ordered_keys = [
-            "id",
-            "name",
-            "age",
-            "gender",
-            "email",
-            "phone",
-            "photo",
-            "seeking_movie",
-        ]
-
-        data = {
-            "id": self.id,
-            "name": self.name,
-            "age": self.age,
-            "gender": str(self.gender.value),
-            "email": self.email,
-            "phone": self.phone,
-            "photo": self.photo,
-            "seeking_movie": self.seeking_movie,
-        }
-
-        ordered_data = {key: data[key] for key in ordered_keys}
-
-        return ordered_data
+        return serialize_actor(self)
 
     def __repr__(self):
         return (
@@ -169,6 +199,14 @@ class Casting(db.Model, DbTransactions):
     actor_cast = db.relationship("Actor", back_populates="actor_castings")
     movie_cast = db.relationship("Movie", back_populates="movie_castings")
 
+    __table_args__ = (
+        # The foreign keys aren't indexed by Postgres, these cover the
+        # lookups from both sides
+        Index("ix_casting_movie_actor", "movie_id", "actor_id"),
+        Index("ix_casting_actor_movie", "actor_id", "movie_id"),
+        {},
+    )
+
     def __init__(self, actor_id, movie_id, role):
         self.actor_id = actor_id
         self.movie_id = movie_id
@@ -177,32 +215,96 @@ class Casting(db.Model, DbTransactions):
     def format_json(self):
         return {
             "id": self.id,
-            "movie_name": self.movies.title,
-            "actor_name": self.actors.name,
+            "movie_id": self.movie_id,
+            "movie_name": self.movie_cast.title,
+            "actor_id": self.actor_id,
+            "actor_name": self.actor_cast.name,
             "role": self.role,
         }
 
     def __repr__(self):
-        return f"""movie: {self.movies.title}, 
-            actor: {self.actors.name} 
+        return f"""movie: {self.movie_cast.title}, 
+            actor: {self.actor_cast.name} 
             role: {self.role}"""
 
 
+serialize_movie = compile_serializer(
+    Movie.id, Movie.title, Movie.genres, Movie.release_date, Movie.seeking_actor
+)
+serialize_actor = compile_serializer(
+    Actor.id,
+    Actor.name,
+    Actor.age,
+    Actor.gender,
+    Actor.email,
+    Actor.phone,
+    Actor.photo,
+    Actor.seeking_movie,
+)
+
+
+def engine_options():
+    """SQLALCHEMY_ENGINE_OPTIONS built from the DB_POOL_* settings."""
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT > 0:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"
+        }
+    return options
+
+
 def setup_db(app, database_path=database_path):
-    print("setup_db config")
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options())
     db.app = app
     db.init_app(app)
+    # Only builds the engine, the schema is managed by the migrations or
+    # the init-db / seed-db / reset-db commands
     with app.app_context():
-        db.drop_all()
-        db.create_all()
-        db_insert_data()
+        pool_metrics.instrument(db.engine)
+    setup_replicas(app, app.config["SQLALCHEMY_ENGINE_OPTIONS"])
 
 
 def setup_migrations(app):
-    migrate = Migrate(app, db)  # setup_migrations
-    migrate.init_app(app, db)  # render_as_batch=False
+    """
+    Register Flask-Migrate, only for the `flask db` commands and manage.py
+    (which import flask_migrate before the app) or when MIGRATIONS is set:
+    alembic is a large part of a worker's import time.
+    """
+    if not app.config.get("MIGRATIONS", "flask_migrate" in sys.modules):
+        return
+    from flask_migrate import Migrate
+
+    Migrate(app, db)  # render_as_batch=False
+
+
+def create_search_indexes():
+    """
+    pg_trgm and the trigram indexes of the search endpoints, as migration
+    b5e1f7c3a862 creates them (create_all() can't, they need the extension).
+    False when pg_trgm isn't available, search then works without them.
+    """
+    try:
+        db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        db.session.execute(
+            text('CREATE INDEX IF NOT EXISTS ix_actors_name_trgm ON "Actors" USING gin (name gin_trgm_ops)')
+        )
+        db.session.execute(
+            text('CREATE INDEX IF NOT EXISTS ix_movies_title_trgm ON "Movies" USING gin (title gin_trgm_ops)')
+        )
+        db.session.commit()
+    except DBAPIError:
+        db.session.rollback()
+        return False
+    return True
 
 
 def db_drop_and_create_all():
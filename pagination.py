@@ -0,0 +1,58 @@
+import os
+import json
+import base64
+from sqlalchemy import tuple_
+
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 1000))
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor, size):
+    """Decode an opaque cursor, raises ValueError if it was tampered with."""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def get_page_args(args, size):
+    """
+    Read `limit` and `cursor` from the request arguments.
+    Raises ValueError on a malformed value.
+    """
+    limit = args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    cursor = args.get("cursor")
+    after = decode_cursor(cursor, size) if cursor else None
+    return limit, after
+
+
+def keyset_page(query, columns, limit, after=None):
+    """
+    Fetch one page of query ordered by columns (the last one must be unique),
+    starting right after the `after` values. Every page is a single index
+    range scan, whatever its position. Returns (rows, next_cursor).
+    """
+    if after is not None:
+        query = query.filter(tuple_(*columns) > tuple_(*after))
+    rows = query.order_by(*columns).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, column.key) for column in columns)
+    return rows, next_cursor
@@ -0,0 +1,46 @@
+from functools import lru_cache
+from models import db, Actor, Movie, serialize_actor, serialize_movie
+from serializers import compile_serializer
+from filters import FilterError
+
+
+# Fields a list payload can be narrowed to, in payload order
+PAYLOAD_FIELDS = {Actor: serialize_actor.fields, Movie: serialize_movie.fields}
+
+
+def get_fields(args, model):
+    """
+    Payload fields asked with `?fields=id,name`, in payload order, every
+    field without the argument. Raises FilterError on an unknown field.
+    """
+    allowed = PAYLOAD_FIELDS[model]
+    value = args.get("fields")
+    if value is None:
+        return allowed
+    asked = {field.strip() for field in value.split(",") if field.strip()}
+    if not asked:
+        raise FilterError("fields must name at least one field")
+    unknown = asked.difference(allowed)
+    if unknown:
+        raise FilterError(
+            f"Unknown fields {', '.join(sorted(unknown))}, "
+            f"expected some of {', '.join(allowed)}"
+        )
+    return tuple(field for field in allowed if field in asked)
+
+
+@lru_cache(maxsize=256)
+def projection_serializer(model, fields):
+    """Serializer of the fields of model, compiled once per field set."""
+    return compile_serializer(*(getattr(model, field) for field in fields))
+
+
+def projected_query(model, fields, order_columns):
+    """
+    Query of the fields of model (plus the order columns, needed by the
+    page cursor) returning plain Row tuples: nothing is loaded into the
+    session identity map and unused columns aren't read.
+    """
+    columns = [getattr(model, field) for field in fields]
+    columns += [column for column in order_columns if column.key not in fields]
+    return db.session.query(*columns)
@@ -0,0 +1,160 @@
+import logging
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from metrics import add_phase_time
+
+logger = logging.getLogger(__name__)
+
+
+# X-Query-Count and X-DB-Time headers on every response (also on in debug)
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "0").lower() in ("1", "true")
+# Runs of the same statement in one request before an N+1 warning
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 10))
+# Statements slower than this (milliseconds) are logged, 0 disables it
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 500))
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMETERS = re.compile(r"%\([^)]+\)s|%s|\$\d+|\?")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """
+    Shape of a statement: literals and parameters become ?, lists and
+    multi-row VALUES collapse to one item, so `id IN (1, 2)` and
+    `id IN (3)` have the same fingerprint.
+    """
+    shape = _COMMENTS.sub(" ", statement)
+    shape = _STRINGS.sub("?", shape)
+    shape = _PARAMETERS.sub("?", shape)
+    shape = _NUMBERS.sub("?", shape)
+    shape = _LISTS.sub("(?)", shape)
+    shape = _ROWS.sub("(?)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+def fingerprint_id(shape):
+    return hashlib.sha1(shape.encode("utf-8")).hexdigest()[:12]
+
+
+class SlowQueryLog:
+    """Statements slower than threshold_ms, logged and aggregated by fingerprint."""
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, max_fingerprints=500):
+        self.threshold_ms = threshold_ms
+        self.max_fingerprints = max_fingerprints
+        self.fingerprints = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement, seconds, endpoint=None):
+        milliseconds = seconds * 1000
+        if not self.threshold_ms or milliseconds < self.threshold_ms:
+            return
+        shape = fingerprint(statement)
+        key = fingerprint_id(shape)
+        logger.warning(
+            "Slow query %.1fms [%s] (%s): %s", milliseconds, key, endpoint or "-", shape
+        )
+        with self._lock:
+            entry = self.fingerprints.get(key)
+            if entry is None:
+                if len(self.fingerprints) >= self.max_fingerprints:
+                    return
+                entry = self.fingerprints[key] = {
+                    "fingerprint": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "endpoints": set(),
+                }
+            entry["count"] += 1
+            entry["total_ms"] += milliseconds
+            entry["max_ms"] = max(entry["max_ms"], milliseconds)
+            if endpoint:
+                entry["endpoints"].add(endpoint)
+
+    def snapshot(self):
+        """Slow fingerprints, slowest total first."""
+        with self._lock:
+            entries = [
+                dict(
+                    entry,
+                    id=key,
+                    total_ms=round(entry["total_ms"], 3),
+                    max_ms=round(entry["max_ms"], 3),
+                    endpoints=sorted(entry["endpoints"]),
+                )
+                for key, entry in self.fingerprints.items()
+            ]
+        return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _current_endpoint():
+    return request.endpoint if has_request_context() else None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    # On the execution context, not the pooled connection: a failed
+    # statement never reaches after_cursor_execute
+    if context is not None:
+        context.query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "query_start", None)
+    if start is None:
+        return
+    seconds = time.perf_counter() - start
+    slow_query_log.record(statement, seconds, _current_endpoint())
+    if not has_request_context():
+        return
+    add_phase_time("db", seconds)
+    g.query_count = g.get("query_count", 0) + 1
+    if "statements" not in g:
+        g.statements = Counter()
+    g.statements[statement] += 1
+
+
+def repeated_statements(statements, threshold=N_PLUS_ONE_THRESHOLD):
+    """(fingerprint, runs) of the statement shapes run more than threshold times."""
+    shapes = Counter()
+    for statement, runs in statements.items():
+        shapes[fingerprint(statement)] += runs
+    return [(shape, runs) for shape, runs in shapes.most_common() if runs > threshold]
+
+
+def setup_query_profiling(app, threshold=N_PLUS_ONE_THRESHOLD):
+    debug = app.config.get("QUERY_DEBUG", QUERY_DEBUG)
+
+    @app.after_request
+    def account_queries(response):
+        # Statements are counted as they run, fingerprints are only
+        # computed here, once per distinct statement
+        for shape, runs in repeated_statements(g.get("statements", {}), threshold):
+            logger.warning(
+                "Possible N+1 in %s: %s runs of [%s] %s",
+                request.endpoint,
+                runs,
+                fingerprint_id(shape),
+                shape,
+            )
+        if debug or app.debug:
+            response.headers["X-Query-Count"] = str(g.get("query_count", 0))
+            response.headers["X-DB-Time"] = f"{g.get('db_seconds', 0.0) * 1000:.3f}"
+        return response
@@ -0,0 +1,172 @@
+import logging
+import os
+import time
+import threading
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+
+logger = logging.getLogger(__name__)
+
+
+# Comma separated URIs of the read replicas, none means every query goes
+# to the primary
+DATABASE_REPLICA_URIS = [
+    uri.strip() for uri in os.getenv("DATABASE_REPLICA_URIS", "").split(",") if uri.strip()
+]
+# Seconds a client reads from the primary after one of its writes
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))
+# Replicas further behind the primary (seconds) are not used
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", 10))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", 5))
+# Seconds a failing replica is left aside
+REPLICA_RETRY_AFTER = float(os.getenv("REPLICA_RETRY_AFTER", 30))
+
+PIN_COOKIE = "db_primary"
+PIN_HEADER = "X-Read-Primary"
+READ_METHODS = ("GET", "HEAD")
+
+# Replay lag in seconds, 0 when the replica has replayed everything it
+# received (an idle primary would otherwise look like lag). NULL outside
+# of recovery, i.e. on a standalone database.
+LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+def replica_lag(engine):
+    with engine.connect() as connection:
+        lag = connection.execute(LAG_QUERY).scalar()
+    return float(lag or 0)
+
+
+class ReplicaSet:
+    """
+    Read engines picked round-robin among the healthy ones. A replica is
+    left aside for `retry_after` seconds when its connections fail or its
+    lag (checked at most every `check_interval` seconds) exceeds `max_lag`.
+    """
+
+    def __init__(
+        self,
+        engines,
+        max_lag=REPLICA_MAX_LAG,
+        check_interval=REPLICA_CHECK_INTERVAL,
+        retry_after=REPLICA_RETRY_AFTER,
+        lag=replica_lag,
+        clock=time.monotonic,
+    ):
+        self.engines = list(engines)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self.lag = lag
+        self.clock = clock
+        self._next = 0
+        self._down_until = [0.0] * len(self.engines)
+        self._checked_at = [None] * len(self.engines)
+        self._lock = threading.Lock()
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine)
+
+    def mark_down(self, engine):
+        index = self.engines.index(engine)
+        with self._lock:
+            self._down_until[index] = self.clock() + self.retry_after
+        logger.warning("Read replica %s is down", engine.url.host or engine.url.database)
+
+    def _healthy(self, index):
+        now = self.clock()
+        if self._down_until[index] > now:
+            return False
+        checked_at = self._checked_at[index]
+        if checked_at is not None and now - checked_at < self.check_interval:
+            return True
+        self._checked_at[index] = now
+        engine = self.engines[index]
+        try:
+            lag = self.lag(engine)
+        except Exception as error:
+            logger.warning("Unable to check read replica lag: %s", error)
+            self.mark_down(engine)
+            return False
+        if lag > self.max_lag:
+            logger.warning("Read replica lag %.1fs is above %ss", lag, self.max_lag)
+            self.mark_down(engine)
+            return False
+        return True
+
+    def select(self):
+        """The next healthy engine, None when every replica is down."""
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % max(len(self.engines), 1)
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self._healthy(index):
+                return self.engines[index]
+        return None
+
+    def dispose(self):
+        for engine in self.engines:
+            engine.dispose()
+
+
+def reads_from_replica():
+    """Only for read requests of clients that did not just write."""
+    return has_request_context() and g.get("db_route") == "replica"
+
+
+class RoutingSession(Session):
+    """
+    Session sending the queries of read requests to a replica, the same
+    one for the whole request, and everything else, flushes included, to
+    the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and reads_from_replica():
+            # One replica per request: the ETag version and the rows must
+            # come from the same database
+            if "db_replica" not in g:
+                replica_set = current_app.extensions.get("replicas")
+                g.db_replica = replica_set.select() if replica_set else None
+            if g.db_replica is not None:
+                return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def setup_replicas(app, engine_options):
+    """Build the replica engines of app and the request routing hooks."""
+    uris = app.config.get("DATABASE_REPLICA_URIS", DATABASE_REPLICA_URIS)
+    if not uris:
+        return
+    app.extensions["replicas"] = ReplicaSet(
+        create_engine(uri, **engine_options) for uri in uris
+    )
+
+    @app.before_request
+    def route_database():
+        pinned = request.cookies.get(PIN_COOKIE) or request.headers.get(PIN_HEADER)
+        if request.method in READ_METHODS and not pinned:
+            g.db_route = "replica"
+        else:
+            g.db_route = "primary"
+
+    @app.after_request
+    def pin_to_primary(response):
+        # Read your own writes: the next reads of this client see the write
+        if request.method not in READ_METHODS + ("OPTIONS",) and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=REPLICA_PIN_SECONDS, httponly=True, samesite="Lax"
+            )
+        return response
@@ -0,0 +1,229 @@
+import logging
+import os
+import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "memory")
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 300))
+
+
+class LRUCacheBackend:
+    """
+    In-process backend, bounded by number of entries and body size. Entries
+    expire after `ttl` seconds, as in the shared store.
+    """
+
+    def __init__(
+        self,
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=RESPONSE_CACHE_MAX_BYTES,
+        ttl=RESPONSE_CACHE_TTL,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry["body"])
+        for tag in entry["tags"]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._clock() >= entry["expires_at"]:
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, tags):
+        if len(entry["body"]) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            entry = dict(entry, tags=tuple(tags), expires_at=self._clock() + self.ttl)
+            self._entries[key] = entry
+            self._bytes += len(entry["body"])
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, tag):
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Backend shared by every worker, on top of a redis-py compatible client.
+    Eviction is left to the server (maxmemory-policy allkeys-lru) and every
+    entry also expires after `ttl` seconds.
+    """
+
+    def __init__(self, client, prefix="casting-agency:", ttl=RESPONSE_CACHE_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}tag:{tag}"
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        entry = json.loads(value)
+        entry["body"] = entry["body"].encode("utf-8")
+        return entry
+
+    def set(self, key, entry, tags):
+        value = json.dumps(dict(entry, body=entry["body"].decode("utf-8")))
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+        for tag in tags:
+            self.client.sadd(self._tag_key(tag), self.prefix + key)
+            self.client.expire(self._tag_key(tag), self.ttl)
+
+    def invalidate(self, tag):
+        keys = self.client.smembers(self._tag_key(tag))
+        self.client.delete(self._tag_key(tag), *keys)
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+def backend_from_env():
+    if RESPONSE_CACHE == "off":
+        return None
+    if RESPONSE_CACHE == "redis":
+        import redis
+
+        return RedisCacheBackend(redis.Redis.from_url(RESPONSE_CACHE_URL))
+    return LRUCacheBackend()
+
+
+class ResponseCache:
+    """
+    Read-through cache of the list responses.
+
+    Entries are keyed by endpoint, URL arguments, query string, response
+    variant and the permission set of the caller, and tagged with the table
+    they were built from so writes evict only the lists of that table. An
+    entry is only served while its ETag (the table version, one primary key
+    read) matches the current one, so a worker never serves a body older
+    than the last write, even with a per-process backend. Single rows are
+    not cached: their ETag read costs as much as the row itself.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    @staticmethod
+    def key_for(request, payload, variant=None):
+        permissions = ",".join(sorted(payload.get("permissions", [])))
+        parts = [
+            str(request.endpoint),
+            json.dumps(request.view_args, sort_keys=True),
+            "&".join(sorted(request.query_string.decode("utf-8").split("&"))),
+            str(variant),
+            hashlib.sha1(permissions.encode("utf-8")).hexdigest(),
+        ]
+        return "|".join(parts)
+
+    @staticmethod
+    def table_tag(model):
+        return model.__tablename__
+
+    def get(self, key, etag):
+        if not self.enabled or etag is None:
+            return None
+        try:
+            entry = self.backend.get(key)
+        except Exception as error:
+            logger.warning("Response cache unavailable: %s", error)
+            return None
+        if entry is None or entry["etag"] != etag:
+            self.misses += 1
+            return None
+        self.hits += 1
+        response = Response(entry["body"], status=entry["status"], mimetype=entry["mimetype"])
+        response.set_etag(etag)
+        return response
+
+    def put(self, key, response, etag, tags):
+        if not self.enabled or etag is None:
+            return response
+        entry = {
+            "body": response.get_data(),
+            "status": response.status_code,
+            "mimetype": response.mimetype,
+            "etag": etag,
+        }
+        try:
+            self.backend.set(key, entry, tags)
+        except Exception as error:
+            logger.warning("Unable to cache response: %s", error)
+        return response
+
+    def invalidate_table(self, model):
+        """Evict the lists of model's table."""
+        self.invalidate(self.table_tag(model))
+
+    def invalidate(self, *tags):
+        if not self.enabled:
+            return
+        for tag in tags:
+            try:
+                self.backend.invalidate(tag)
+            except Exception as error:
+                logger.error("Unable to invalidate cached responses for %s: %s", tag, error)
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+
+response_cache = ResponseCache(backend_from_env())
@@ -0,0 +1,90 @@
+from sqlalchemy import REAL, and_, case, cast, func, literal, or_, text
+from models import db
+from pagination import encode_cursor
+
+
+MAX_QUERY_LENGTH = 100
+
+_trigram_available = None
+
+
+def has_trigram():
+    """Whether pg_trgm is installed in the database, checked once per process."""
+    global _trigram_available
+    if _trigram_available is None:
+        _trigram_available = bool(
+            db.session.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).scalar()
+        )
+    return _trigram_available
+
+
+def escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def get_search_query(args):
+    """The `q` argument, raises ValueError if it is missing or too long."""
+    q = args.get("q", "").strip()
+    if not q:
+        raise ValueError("q is required")
+    if len(q) > MAX_QUERY_LENGTH:
+        raise ValueError(f"q must have at most {MAX_QUERY_LENGTH} characters")
+    return q
+
+
+def score_expression(column, q):
+    """
+    Trigram similarity between column and q. Without pg_trgm, exact
+    matches rank first, then prefixes, then any other substring.
+    """
+    if has_trigram():
+        return func.similarity(column, q)
+    lowered = func.lower(column)
+    return cast(
+        case(
+            (lowered == q.lower(), 1.0),
+            (lowered.like(escape_like(q.lower()) + "%", escape="\\"), 0.75),
+            else_=0.5,
+        ),
+        REAL,
+    )
+
+
+def match_condition(column, q):
+    """
+    Substring (ILIKE) or trigram (%) match, both served by the GIN
+    gin_trgm_ops index on the column.
+    """
+    condition = column.ilike("%" + escape_like(q) + "%", escape="\\")
+    if has_trigram():
+        condition = or_(condition, column.op("%")(q))
+    return condition
+
+
+def search_page(model, column, q, limit, after=None):
+    """
+    One page of the rows of model matching q, best match first. The cursor
+    is the (score, id) of the last row. Returns ([(row, score)], next_cursor).
+    """
+    score = score_expression(column, q)
+    query = db.session.query(model, score.label("score")).filter(
+        match_condition(column, q)
+    )
+    if after is not None:
+        last_score, last_id = after
+        # Scores are real: the cursor value must be compared as a real too,
+        # as a double it is never equal to the score it was read from
+        last_score = cast(literal(last_score), REAL)
+        query = query.filter(
+            or_(score < last_score, and_(score == last_score, model.id > last_id))
+        )
+    rows = query.order_by(score.desc(), model.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        row, row_score = rows[-1]
+        next_cursor = encode_cursor([float(row_score), row.id])
+    return rows, next_cursor
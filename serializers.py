@@ -0,0 +1,41 @@
+from sqlalchemy import Date, DateTime, Enum
+
+
+def enum_value(value):
+    return None if value is None else value.value
+
+
+def datetime_value(value):
+    return None if value is None else str(value)
+
+
+def _expression(key, column):
+    """Python expression reading `row.<key>`, converted for JSON."""
+    attribute = f"row.{key}"
+    if isinstance(column.type, Enum) and column.type.enum_class is not None:
+        return f"{attribute}.value" if not column.nullable else f"_enum({attribute})"
+    if isinstance(column.type, (Date, DateTime)):
+        return f"str({attribute})" if not column.nullable else f"_datetime({attribute})"
+    return attribute
+
+
+def compile_serializer(*attributes):
+    """
+    Function turning a row into the dict of the given model attributes, in
+    that order. The function is generated once per model: a row costs one
+    dict display, no intermediate dict and no per-column dispatch. Enum
+    columns give their value and Date/DateTime columns their str(). Works
+    on model instances and on the Row tuples of a select of the columns.
+    """
+    fields = ", ".join(
+        f"{attribute.key!r}: "
+        + _expression(attribute.key, attribute.property.columns[0])
+        for attribute in attributes
+    )
+    name = attributes[0].class_.__name__ if attributes else "row"
+    source = f"def serialize(row):\n    return {{{fields}}}\n"
+    namespace = {"_enum": enum_value, "_datetime": datetime_value}
+    exec(compile(source, f"<{name} serializer>", "exec"), namespace)
+    serialize = namespace["serialize"]
+    serialize.fields = tuple(attribute.key for attribute in attributes)
+    return serialize
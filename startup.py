@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import time
+
+
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0").lower() in ("1", "true")
+
+
+class StartupProfile:
+    """
+    Cold start phases of a worker. Each mark records the time elapsed since
+    the previous mark (or restart), so the phases add up to the start time.
+    Disabled unless STARTUP_PROFILE is set, marks are then no-ops.
+    """
+
+    def __init__(self, enabled=STARTUP_PROFILE, clock=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.phases = []
+        self._last = clock()
+
+    def restart(self):
+        self._last = self.clock()
+
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = self.clock()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def report(self, file=sys.stderr):
+        """One JSON line per phase, in milliseconds."""
+        if not self.enabled:
+            return
+        for name, seconds in self.phases:
+            print(
+                json.dumps({"phase": name, "ms": round(seconds * 1000, 3)}),
+                file=file,
+            )
+
+
+# Created when app.py starts importing its dependencies
+startup_profile = StartupProfile()
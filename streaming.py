@@ -0,0 +1,58 @@
+import os
+from flask import Response, stream_with_context
+from models import db
+from json_provider import encode_json
+
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 1000))
+
+NDJSON = "application/x-ndjson"
+JSON = "application/json"
+
+
+def get_stream_format(request):
+    """
+    Content type to stream the response with, None for a regular response.
+    Streaming is asked with `?stream=1` or `Accept: application/x-ndjson`.
+    """
+    if request.accept_mimetypes.best_match([JSON, NDJSON], default=JSON) == NDJSON:
+        return NDJSON
+    if request.args.get("stream", "0").lower() in ("1", "true"):
+        if request.args.get("format") == "ndjson":
+            return NDJSON
+        return JSON
+    return None
+
+
+def generate_rows(
+    query, key, content_type, serialize, encode=encode_json, batch_size=STREAM_BATCH_SIZE
+):
+    """
+    Encode the rows of query one at a time. Rows are read through a
+    server-side cursor in batches, so memory does not depend on the number
+    of rows. `encode` turns a serialized row into JSON bytes.
+    """
+    try:
+        rows = query.yield_per(batch_size)
+        if content_type == NDJSON:
+            for row in rows:
+                yield encode(serialize(row)) + b"\n"
+            return
+
+        yield b'{"success":true,"%s":[' % key.encode("utf-8")
+        first = True
+        for row in rows:
+            yield (b"" if first else b",") + encode(serialize(row))
+            first = False
+        yield b"]}"
+    finally:
+        db.session.close()
+
+
+def stream_response(
+    query, key, content_type, serialize=lambda row: row.format_json(), encode=encode_json
+):
+    return Response(
+        stream_with_context(generate_rows(query, key, content_type, serialize, encode)),
+        mimetype=content_type,
+    )
@@ -0,0 +1,54 @@
+import json
+import unittest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from werkzeug.datastructures import MultiDict
+from aggregation import get_json_agg, json_page_response, json_rows
+from models import Actor, Movie
+
+
+def compiled(query):
+    return str(query.statement.compile(dialect=postgresql.dialect()))
+
+
+class JSONAggregationCase(unittest.TestCase):
+    """
+    This class represents the Postgres built JSON test case
+    """
+
+    def test_json_agg_argument(self):
+        self.assertTrue(get_json_agg(MultiDict({"json_agg": "true"})))
+        self.assertFalse(get_json_agg(MultiDict()))
+
+    def test_row_objects(self):
+        session = Session()
+        query = session.query(Movie.id, Movie.release_date, Movie.title)
+        sql = compiled(json_rows(query, Movie, ("id", "release_date")))
+
+        self.assertIn("json_build_object", sql)
+        self.assertIn("to_char", sql)
+        self.assertNotIn("title", sql.split("FROM")[0])
+
+    def test_enum_labels_are_the_values(self):
+        sql = compiled(json_rows(Session().query(Actor.gender), Actor, ("gender",)))
+
+        self.assertNotIn("CASE", sql)
+
+    def test_response_is_not_reencoded(self):
+        items = '[{"id" : 1, "name" : "Sandy"}]'
+        res = json_page_response("actors", items, 2, None)
+
+        self.assertIn(items.encode("utf-8"), res.data)
+        self.assertEqual(
+            json.loads(res.data),
+            {
+                "success": True,
+                "actors": [{"id": 1, "name": "Sandy"}],
+                "limit": 2,
+                "next_cursor": None,
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,13 +2,12 @@ import os
 from dotenv import load_dotenv
 import unittest
 import json
-from flask_sqlalchemy import SQLAlchemy
 from app import create_app
 from models import (
-    setup_db,
     db_drop_and_create_all,
     Movie,
     Actor,
+    GenderType,
     db_insert_data
 )
 
@@ -28,19 +27,18 @@ class CastingAgencyCase(unittest.TestCase):
     """
 
     def setUp(self):
-        self.app = create_app()
-        self.client = self.app.test_client
-
         # Setting up Database connection
         self.database_path = "postgresql://{}:{}@localhost:{}/{}".format(
             "postgres", "admin", 5432, "castAgencyTests")
 
         print("Tests -> Setting up Database connection", self.database_path)
 
-        setup_db(self.app, self.database_path)
+        self.app = create_app(
+            {"TESTING": True, "SQLALCHEMY_DATABASE_URI": self.database_path}
+        )
+        self.client = self.app.test_client
+
         with self.app.app_context():
-            self.db = SQLAlchemy()
-            self.db.init_app(self.app)
             db_drop_and_create_all()
             db_insert_data()
 
@@ -63,6 +61,157 @@ class CastingAgencyCase(unittest.TestCase):
         self.assertTrue(data["actors"])
         self.assertGreater(len(data["actors"]), 0)
 
+    def test_retrieve_actors_with_filters(self):
+        res = self.client().get(
+            "/actors?gender=female&min_age=20&max_age=30&seeking_movie=true",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([actor["name"] for actor in data["actors"]], ["Sandy"])
+
+    def test_retrieve_actors_with_filters_without_match(self):
+        res = self.client().get(
+            "/actors?gender=male&max_age=30",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["actors"], [])
+
+    def test_400_retrieve_actors_with_invalid_filter(self):
+        res = self.client().get(
+            "/actors?min_age=twenty",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(data["success"], False)
+
+    def test_retrieve_actors_paginated(self):
+        res = self.client().get(
+            "/actors?limit=1", headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data["actors"]), 1)
+        self.assertEqual(data["limit"], 1)
+        self.assertTrue(data["next_cursor"])
+
+        res = self.client().get(
+            "/actors?limit=1&cursor=" + data["next_cursor"],
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        next_page = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(next_page["actors"]), 1)
+        self.assertNotEqual(next_page["actors"][0]["id"], data["actors"][0]["id"])
+
+    def test_400_retrieve_actors_with_invalid_cursor(self):
+        res = self.client().get(
+            "/actors?cursor=not-a-cursor",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(data["success"], False)
+
+    def test_retrieve_actors_with_json_agg_paginated(self):
+        res = self.client().get(
+            "/actors?json_agg=1&limit=1",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data["actors"]), 1)
+        self.assertEqual(data["limit"], 1)
+        self.assertTrue(data["next_cursor"])
+
+        res = self.client().get(
+            "/actors?json_agg=1&limit=1&cursor=" + data["next_cursor"],
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        next_page = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(next_page["actors"]), 1)
+        self.assertNotEqual(next_page["actors"][0]["id"], data["actors"][0]["id"])
+
+    def test_retrieve_actors_with_json_agg_without_match(self):
+        res = self.client().get(
+            "/actors?json_agg=1&gender=male&max_age=30",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["actors"], [])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_retrieve_actors_with_fields(self):
+        res = self.client().get(
+            "/actors?fields=id,name&limit=1",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data["actors"]), 1)
+        self.assertEqual(set(data["actors"][0]), {"id", "name"})
+        self.assertTrue(data["next_cursor"])
+
+        res = self.client().get(
+            "/actors?fields=id,name&limit=1&cursor=" + data["next_cursor"],
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        next_page = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(set(next_page["actors"][0]), {"id", "name"})
+        self.assertNotEqual(next_page["actors"][0]["id"], data["actors"][0]["id"])
+
+    def test_400_retrieve_actors_with_unknown_field(self):
+        res = self.client().get(
+            "/actors?fields=id,bogus",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(data["success"], False)
+
+    def test_stream_actors(self):
+        res = self.client().get(
+            "/actors?stream=1", headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["success"], True)
+        self.assertEqual(len(data["actors"]), 3)
+
+    def test_stream_actors_as_ndjson(self):
+        res = self.client().get(
+            "/actors",
+            headers={
+                "Authorization": f"Bearer {PRODUCER_TOKEN}",
+                "Accept": "application/x-ndjson",
+            },
+        )
+        lines = res.data.decode("utf-8").splitlines()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, "application/x-ndjson")
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(json.loads(lines[0])["name"])
+
     def test_401_retrieve_actors_without_authorization_headers(self):
         res = self.client().get("/actors")
         data = json.loads(res.data)
@@ -106,6 +255,35 @@ class CastingAgencyCase(unittest.TestCase):
         self.assertGreater(len(data["actor"]), 0)
         self.assertEqual(data["actor"]["id"], actor_id)
 
+    def test_304_retrieve_actors_not_modified(self):
+        headers = {"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        res = self.client().get("/actors", headers=headers)
+        etag = res.headers["ETag"]
+
+        res = self.client().get("/actors", headers={**headers, "If-None-Match": etag})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b"")
+
+    def test_etag_changes_after_modifying_actor(self):
+        headers = {"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        list_etag = self.client().get("/actors", headers=headers).headers["ETag"]
+        row_etag = self.client().get("/actors/1", headers=headers).headers["ETag"]
+
+        self.client().patch(
+            "/actors/1",
+            data=json.dumps({"name": "Sandy", "age": 21, "gender": "female",
+                             "email": "sandyproom@gmail.com", "phone": "1234567890",
+                             "photo": "link to photo", "seeking_movie": True}),
+            headers={**headers, "Content-Type": "application/json"},
+        )
+        res_list = self.client().get("/actors", headers={**headers, "If-None-Match": list_etag})
+        res_row = self.client().get("/actors/1", headers={**headers, "If-None-Match": row_etag})
+
+        self.assertEqual(res_list.status_code, 200)
+        self.assertEqual(res_row.status_code, 200)
+        self.assertNotEqual(res_row.headers["ETag"], row_etag)
+
     def test_404_retrieve_actor_which_does_not_exist(self):
         res = self.client().get(
             "/actors/100000",
@@ -140,6 +318,8 @@ class CastingAgencyCase(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertEqual(data["success"], True)
         self.assertTrue(data["actor_id"])
+        self.assertEqual(data["actors_total"], 4)
+        self.assertEqual(data["count_mode"], "exact")
 
     def test_422_add_actor_with_not_enough_data(self): # ❗
         actor = {
@@ -207,6 +387,105 @@ class CastingAgencyCase(unittest.TestCase):
         self.assertFalse(data["success"])
         self.assertEqual(data["message"], "User don't have sufficient permission")
 
+    def test_bulk_add_actors(self):
+        actors = [
+            {
+                "name": f"bulk_actor_{i}",
+                "age": 30,
+                "gender": "male",
+                "email": f"bulk_actor_{i}@gmail.com",
+                "phone": f"555000{i}",
+                "photo": "photo link",
+                "seeking_movie": True,
+            }
+            for i in range(3)
+        ]
+        res = self.client().post(
+            "/actors/bulk",
+            data=json.dumps(actors),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {PRODUCER_TOKEN}",
+            },
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["success"], True)
+        self.assertEqual([item["index"] for item in data["created"]], [0, 1, 2])
+        self.assertEqual(data["errors"], [])
+        for item in data["created"]:
+            res = self.client().get(
+                f"/actors/{item['id']}",
+                headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+            )
+            self.assertEqual(
+                json.loads(res.data)["actor"]["name"], f"bulk_actor_{item['index']}"
+            )
+
+    def test_422_bulk_add_actors_is_all_or_nothing(self):
+        actors = [
+            {
+                "name": "bulk_actor",
+                "age": 30,
+                "gender": "male",
+                "email": "bulk_actor@gmail.com",
+                "phone": "5550000",
+                "photo": "photo link",
+                "seeking_movie": True,
+            },
+            {"name": "incomplete_actor"},
+        ]
+        res = self.client().post(
+            "/actors/bulk",
+            data=json.dumps(actors),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {PRODUCER_TOKEN}",
+            },
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data["success"], False)
+        self.assertEqual(data["errors"][0]["index"], 1)
+        with self.app.app_context():
+            self.assertEqual(Actor.query.count(), 3)
+
+    def test_bulk_add_movies_partial(self):
+        movies = [
+            {"title": "bulk_movie", "genres": ["Drama"], "release_date": "2040/01/01", "seeking_actor": True},
+            {"title": "past_movie", "genres": ["Drama"], "release_date": "2001/01/01", "seeking_actor": True},
+        ]
+        res = self.client().post(
+            "/movies/bulk?mode=partial",
+            data=json.dumps(movies),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {PRODUCER_TOKEN}",
+            },
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data["created"]), 1)
+        self.assertEqual(data["errors"][0]["index"], 1)
+        self.assertIn("release_date", data["errors"][0]["errors"])
+
+    def test_401_bulk_add_actors_unauthorized(self):
+        res = self.client().post(
+            "/actors/bulk",
+            data=json.dumps([]),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {CASTING_ASSISTANT_TOKEN}",
+            },
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 401)
+        self.assertFalse(data["success"])
+
     def test_modify_actor(self):
         with self.app.app_context():
             actor = Actor.query.filter(Actor.id == 1).one_or_none()
@@ -297,6 +576,35 @@ class CastingAgencyCase(unittest.TestCase):
         self.assertTrue(data["deleted_actor"])
         self.assertEqual(data["deleted_actor"]["id"], 1)
 
+    def test_bulk_delete_actors_by_ids(self):
+        res = self.client().delete(
+            "/actors/bulk",
+            data=json.dumps({"ids": [1, 2, 100000]}),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {PRODUCER_TOKEN}",
+            },
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["deleted"], [1, 2])
+        self.assertEqual(data["count"], 2)
+
+    def test_400_bulk_delete_actors_with_unknown_filter(self):
+        res = self.client().delete(
+            "/actors/bulk",
+            data=json.dumps({"filter": {"unknown": 1}}),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {PRODUCER_TOKEN}",
+            },
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(data["success"], False)
+
     def test_404_delete_actor_which_does_not_exist(self):
         res = self.client().delete(
             "/actors/10000",
@@ -332,6 +640,81 @@ class CastingAgencyCase(unittest.TestCase):
         self.assertTrue(data["movies"])
         self.assertGreater(len(data["movies"]), 0)
 
+    def test_retrieve_movies_paginated(self):
+        res = self.client().get(
+            "/movies?limit=2", headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data["movies"]), 2)
+        self.assertTrue(data["next_cursor"])
+
+        res = self.client().get(
+            "/movies?limit=2&cursor=" + data["next_cursor"],
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        next_page = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(next_page["movies"]), 1)
+        self.assertIsNone(next_page["next_cursor"])
+
+    def test_retrieve_movies_by_genre(self):
+        res = self.client().get(
+            "/movies?genre=Comedy&genre=Drama",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data["movies"]), 2)
+        self.assertTrue(
+            all({"Comedy", "Drama"} & set(movie["genres"]) for movie in data["movies"])
+        )
+
+        res = self.client().get(
+            "/movies?genre=Comedy&genre=Drama&genre_match=all",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["movies"], [])
+
+    def test_retrieve_movies_by_release_date(self):
+        res = self.client().get(
+            "/movies?seeking_actor=true&release_date_from=2024/01/01",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([movie["title"] for movie in data["movies"]], ["Cry cry cry"])
+
+    def test_400_retrieve_movies_with_unknown_genre_match(self):
+        res = self.client().get(
+            "/movies?genre=Drama&genre_match=some",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(data["success"], False)
+
+    def test_retrieve_movie_genres(self):
+        res = self.client().get(
+            "/movies/genres", headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["success"], True)
+        self.assertEqual(
+            {genre["genre"]: genre["movies"] for genre in data["genres"]},
+            {"TV show": 1, "Comedy": 1, "Drama": 1},
+        )
+
     def test_401_retrieve_movies_with_no_authorization_headers(self):
         res = self.client().get("/movies")
         data = json.loads(res.data)
@@ -340,6 +723,24 @@ class CastingAgencyCase(unittest.TestCase):
         self.assertEqual(data["success"], False)
         self.assertEqual(data["message"], "Authorization header is expected")
 
+    def test_401_retrieve_debug_metrics_without_authorization_headers(self):
+        for url in ("/metrics/pool", "/metrics/slow-queries"):
+            res = self.client().get(url)
+            data = json.loads(res.data)
+
+            self.assertEqual(res.status_code, 401)
+            self.assertEqual(data["success"], False)
+
+    def test_401_retrieve_pool_metrics_without_permission(self):
+        res = self.client().get(
+            "/metrics/pool", headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 401)
+        self.assertEqual(data["success"], False)
+        self.assertEqual(data["message"], "User don't have sufficient permission")
+
     def test_405_use_not_allowed_method(self):
         res = self.client().post(
             "/movies", headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"}
@@ -396,6 +797,8 @@ class CastingAgencyCase(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertEqual(data["success"], True)
         self.assertTrue(data["movie_id"])
+        self.assertEqual(data["movies_total"], 4)
+        self.assertEqual(data["count_mode"], "exact")
 
     def test_422_add_movie_with_not_enough_data(self): #❗
         movie = {
@@ -458,6 +861,58 @@ class CastingAgencyCase(unittest.TestCase):
         self.assertFalse(data["success"])
         self.assertEqual(data["message"], "User don't have sufficient permission")
 
+    def test_bulk_modify_movies_by_filter(self):
+        res = self.client().patch(
+            "/movies/bulk",
+            data=json.dumps(
+                {"filter": {"seeking_actor": True}, "set": {"seeking_actor": False}}
+            ),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {PRODUCER_TOKEN}",
+            },
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["count"], 3)
+        with self.app.app_context():
+            self.assertEqual(Movie.query.filter(Movie.seeking_actor).count(), 0)
+
+    def test_bulk_modify_movies_dry_run(self):
+        res = self.client().patch(
+            "/movies/bulk",
+            data=json.dumps(
+                {"ids": [1, 2], "set": {"seeking_actor": False}, "dry_run": True}
+            ),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {PRODUCER_TOKEN}",
+            },
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["updated"], [1, 2])
+        with self.app.app_context():
+            self.assertEqual(Movie.query.filter(Movie.seeking_actor).count(), 3)
+
+    def test_422_bulk_modify_movies_over_max_rows(self):
+        res = self.client().patch(
+            "/movies/bulk",
+            data=json.dumps(
+                {"filter": {"seeking_actor": True}, "set": {"seeking_actor": False}, "max_rows": 1}
+            ),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {PRODUCER_TOKEN}",
+            },
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data["success"], False)
+
     def test_modify_movie(self):
         with self.app.app_context():
             movie = Movie.query.filter(Movie.id == 1).one_or_none()
@@ -557,6 +1012,122 @@ class CastingAgencyCase(unittest.TestCase):
         self.assertFalse(data["success"])
         self.assertEqual(data["message"], "User don't have sufficient permission")
 
+    # ---------------------------------------#
+    # Test castings endpoints
+    # ---------------------------------------#
+    def test_retrieve_castings(self):
+        res = self.client().get(
+            "/castings", headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["success"], True)
+        self.assertEqual(len(data["castings"]), 3)
+        self.assertEqual(data["castings"][0]["movie_name"], "Big house")
+        self.assertEqual(data["castings"][0]["actor_name"], "Sandy")
+
+    def test_retrieve_movie_castings(self):
+        res = self.client().get(
+            "/movies/1/castings", headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data["castings"]), 2)
+        self.assertTrue(all(casting["movie_id"] == 1 for casting in data["castings"]))
+
+    def test_retrieve_actor_castings(self):
+        res = self.client().get(
+            "/actors/3/castings", headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data["castings"]), 2)
+        self.assertTrue(all(casting["actor_id"] == 3 for casting in data["castings"]))
+
+    def test_404_retrieve_castings_of_actor_which_does_not_exist(self):
+        res = self.client().get(
+            "/actors/100000/castings",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(data["success"], False)
+
+
+    # ---------------------------------------#
+    # Test search endpoints
+    # ---------------------------------------#
+    def test_search_actors(self):
+        res = self.client().get(
+            "/actors/search?q=sandy",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["success"], True)
+        self.assertEqual(data["actors"][0]["name"], "Sandy")
+        scores = [actor["score"] for actor in data["actors"]]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_search_movies_page(self):
+        res = self.client().get(
+            "/movies/search?q=e&limit=1",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        data = json.loads(res.data)
+        next_page = self.client().get(
+            f"/movies/search?q=e&limit=1&cursor={data['next_cursor']}",
+            headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+        )
+        next_data = json.loads(next_page.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data["movies"]), 1)
+        self.assertEqual(next_page.status_code, 200)
+        self.assertNotEqual(data["movies"][0]["id"], next_data["movies"][0]["id"])
+
+    def test_search_actors_pages_with_equal_scores(self):
+        with self.app.app_context():
+            for index, suffix in enumerate(("A", "B", "C")):
+                Actor(
+                    name=f"Tom {suffix}",
+                    age=30,
+                    gender=GenderType.male,
+                    email=f"tom{index}@example.com",
+                    phone=f"98765432{index}",
+                    photo="https://example.com/tom.jpg",
+                    seeking_movie=True,
+                ).insert()
+
+        found, cursor = [], None
+        for _ in range(4):
+            res = self.client().get(
+                "/actors/search?q=tom&limit=1" + (f"&cursor={cursor}" if cursor else ""),
+                headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"},
+            )
+            data = json.loads(res.data)
+            self.assertEqual(res.status_code, 200)
+            found += [actor["name"] for actor in data["actors"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(sorted(found), ["Tom A", "Tom B", "Tom C"])
+
+    def test_400_search_without_query(self):
+        res = self.client().get(
+            "/actors/search?q=", headers={"Authorization": f"Bearer {PRODUCER_TOKEN}"}
+        )
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(data["success"], False)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,248 @@
+import base64
+import threading
+import unittest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from auth.jwks import JWKSKeyStore, JWKSFetchError
+from auth.token_cache import VerifiedTokenCache
+from auth.permissions import PermissionRegistry
+from test_helpers import FakeClock
+
+
+def b64url_uint(value):
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def make_jwk(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    numbers = private_key.public_key().public_numbers()
+    return {
+        "kty": "RSA",
+        "kid": kid,
+        "use": "sig",
+        "alg": "RS256",
+        "n": b64url_uint(numbers.n),
+        "e": b64url_uint(numbers.e),
+    }
+
+
+class FakeIssuer:
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.calls = 0
+        self.down = False
+
+    def __call__(self, url):
+        self.calls += 1
+        if self.down:
+            raise OSError("issuer unreachable")
+        return {"keys": self.keys}
+
+
+class JWKSKeyStoreCase(unittest.TestCase):
+    """
+    This class represents the JWKS key store test case
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.key_a = make_jwk("key-a")
+        cls.key_b = make_jwk("key-b")
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.issuer = FakeIssuer(self.key_a)
+        self.store = JWKSKeyStore(
+            "https://issuer/.well-known/jwks.json",
+            ttl=100,
+            refresh_ahead=10,
+            min_refetch_interval=5,
+            fetch=self.issuer,
+            clock=self.clock,
+        )
+
+    def test_keys_are_fetched_once_within_ttl(self):
+        self.assertIsNotNone(self.store.get_key("key-a"))
+        self.clock.now = 50
+        self.assertIsNotNone(self.store.get_key("key-a"))
+
+        self.assertEqual(self.issuer.calls, 1)
+
+    def test_unknown_kid_triggers_a_single_refetch(self):
+        self.store.get_key("key-a")
+        self.issuer.keys.append(self.key_b)
+        self.clock.now = 10
+
+        self.assertIsNotNone(self.store.get_key("key-b"))
+        self.assertIsNone(self.store.get_key("key-c"))
+        self.assertIsNone(self.store.get_key("key-c"))
+        self.assertEqual(self.issuer.calls, 2)
+
+    def test_stale_keys_are_served_when_issuer_is_down(self):
+        self.store.get_key("key-a")
+        self.issuer.down = True
+        self.clock.now = 500
+
+        self.assertIsNotNone(self.store.get_key("key-a"))
+        self.assertEqual(self.store.kids, frozenset({"key-a"}))
+
+    def test_error_when_keys_never_fetched(self):
+        self.issuer.down = True
+
+        with self.assertRaises(JWKSFetchError):
+            self.store.get_key("key-a")
+
+    def test_refresh_ahead_of_expiry_runs_in_background(self):
+        self.store.get_key("key-a")
+        release = threading.Event()
+        fetch = self.store._fetch
+
+        def slow_fetch(url):
+            release.wait(timeout=5)
+            return fetch(url)
+
+        self.store._fetch = slow_fetch
+        self.issuer.keys = [self.key_b]
+        self.clock.now = 95
+
+        # The current key set is still served while the refresh runs
+        self.assertIsNotNone(self.store.get_key("key-a"))
+        release.set()
+        self.store._refresh_thread.join(timeout=5)
+        self.assertEqual(self.store.kids, frozenset({"key-b"}))
+
+    def test_background_refresh_respects_min_refetch_interval(self):
+        self.store.get_key("key-a")
+        self.issuer.down = True
+        self.clock.now = 95
+
+        for _ in range(50):
+            self.assertIsNotNone(self.store.get_key("key-a"))
+            if self.store._refresh_thread is not None:
+                self.store._refresh_thread.join(timeout=5)
+
+        self.assertEqual(self.issuer.calls, 2)
+
+    def test_inline_refresh_keeps_background_refresh_flag(self):
+        self.store.get_key("key-a")
+        release = threading.Event()
+        fetch = self.store._fetch
+
+        def slow_fetch(url):
+            release.wait(timeout=5)
+            return fetch(url)
+
+        self.store._fetch = slow_fetch
+        self.clock.now = 95
+        self.store.get_key("key-a")
+        self.store._fetch = fetch
+        self.store.refresh()
+
+        self.assertTrue(self.store._refreshing)
+        release.set()
+        self.store._refresh_thread.join(timeout=5)
+        self.assertFalse(self.store._refreshing)
+
+    def test_listeners_are_told_about_key_rotation(self):
+        changes = []
+        self.store.add_listener(lambda old, new: changes.append((old, new)))
+        self.store.get_key("key-a")
+        self.issuer.keys = [self.key_b]
+        self.clock.now = 10
+        self.store.get_key("key-b")
+
+        self.assertEqual(changes, [(frozenset({"key-a"}), frozenset({"key-b"}))])
+
+
+class VerifiedTokenCacheCase(unittest.TestCase):
+    """
+    This class represents the verified token cache test case
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = VerifiedTokenCache(max_entries=2, clock=self.clock)
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.cache.get("token-1"))
+        self.cache.put("token-1", {"sub": "a", "exp": 100}, kid="key-a")
+
+        self.assertEqual(self.cache.get("token-1").payload["sub"], "a")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_entries_expire_with_the_token(self):
+        self.cache.put("token-1", {"sub": "a", "exp": 100})
+        self.clock.now = 100
+
+        self.assertIsNone(self.cache.get("token-1"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_tokens_without_exp_are_not_cached(self):
+        self.cache.put("token-1", {"sub": "a"})
+
+        self.assertIsNone(self.cache.get("token-1"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.put("token-1", {"sub": "a", "exp": 100})
+        self.cache.put("token-2", {"sub": "b", "exp": 100})
+        self.cache.get("token-1")
+        self.cache.put("token-3", {"sub": "c", "exp": 100})
+
+        self.assertIsNotNone(self.cache.get("token-1"))
+        self.assertIsNone(self.cache.get("token-2"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_memory_bound(self):
+        cache = VerifiedTokenCache(max_bytes=2000, clock=self.clock)
+        for i in range(50):
+            cache.put(f"token-{i}", {"sub": "x" * 100, "exp": 100})
+
+        self.assertLessEqual(cache.stats()["bytes"], 2000)
+        self.assertIsNotNone(cache.get("token-49"))
+
+    def test_entries_of_rotated_keys_are_dropped(self):
+        self.cache.put("token-1", {"sub": "a", "exp": 100}, kid="key-a")
+        self.cache.put("token-2", {"sub": "b", "exp": 100}, kid="key-b")
+        self.cache.on_key_set_change(frozenset({"key-a", "key-b"}), frozenset({"key-b"}))
+
+        self.assertIsNone(self.cache.get("token-1"))
+        self.assertIsNotNone(self.cache.get("token-2"))
+
+    def test_clear(self):
+        self.cache.put("token-1", {"sub": "a", "exp": 100})
+        self.cache.clear()
+
+        self.assertIsNone(self.cache.get("token-1"))
+
+
+class PermissionRegistryCase(unittest.TestCase):
+    """
+    This class represents the permission registry test case
+    """
+
+    def setUp(self):
+        self.registry = PermissionRegistry()
+        self.registry.register("get:actors", "retrieve_actors")
+        self.registry.register("get:actors", "retrieve_actor")
+        self.registry.register("delete:actors", "delete_actor")
+
+    def test_each_permission_gets_one_bit(self):
+        self.assertEqual(self.registry.bit("get:actors"), 1)
+        self.assertEqual(self.registry.bit("delete:actors"), 2)
+        self.assertIsNone(self.registry.bit("get:movies"))
+        self.assertEqual(self.registry.version, 2)
+
+    def test_grants_mask(self):
+        grants = self.registry.grants(["get:actors", "unknown:permission"])
+
+        self.assertTrue(grants & self.registry.bit("get:actors"))
+        self.assertFalse(grants & self.registry.bit("delete:actors"))
+
+    def test_permission_by_endpoint(self):
+        self.assertEqual(self.registry.permission_for("retrieve_actor"), "get:actors")
+        self.assertIsNone(self.registry.permission_for("index"))
+
+
+if __name__ == "__main__":
+    unittest.main()
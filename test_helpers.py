@@ -0,0 +1,8 @@
+class FakeClock:
+    """Clock of the tests, it only moves when now is set."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
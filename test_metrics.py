@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+import tempfile
+import unittest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+from metrics import (
+    Histogram,
+    PoolMetrics,
+    RequestMetrics,
+    TimedQueuePool,
+    add_phase_time,
+    pool_metrics,
+    setup_request_metrics,
+)
+
+
+class HistogramCase(unittest.TestCase):
+    """
+    This class represents the histogram test case
+    """
+
+    def test_cumulative_buckets(self):
+        histogram = Histogram(buckets=(1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+
+        self.assertEqual(snapshot["buckets"], {"1": 2, "5": 3, "+Inf": 4})
+        self.assertEqual(snapshot["count"], 4)
+        self.assertEqual(snapshot["sum"], 14.5)
+
+
+class PoolMetricsCase(unittest.TestCase):
+    """
+    This class represents the connection pool metrics test case, run on a
+    SQLite file with the same pool class as the API
+    """
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(
+            f"sqlite:///{self.path}",
+            poolclass=TimedQueuePool,
+            pool_size=1,
+            max_overflow=1,
+        )
+        self.metrics = PoolMetrics()
+        self.metrics.instrument(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_checkouts_and_overflow(self):
+        waits = pool_metrics.wait_time.count
+        with self.engine.connect() as first, self.engine.connect() as second:
+            first.execute(text("SELECT 1"))
+            second.execute(text("SELECT 1"))
+            snapshot = self.metrics.snapshot()
+
+        self.assertEqual(snapshot["checkouts"], 2)
+        self.assertEqual(snapshot["connects"], 2)
+        self.assertEqual(snapshot["checked_out"], 2)
+        self.assertEqual(snapshot["overflow"], 1)
+        self.assertEqual(snapshot["max_checked_out"], 2)
+        self.assertEqual(snapshot["overflow_histogram"]["buckets"]["0"], 1)
+        self.assertEqual(pool_metrics.wait_time.count, waits + 2)
+
+    def test_connections_are_reused(self):
+        for _ in range(3):
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        snapshot = self.metrics.snapshot()
+
+        self.assertEqual(snapshot["checkouts"], 3)
+        self.assertEqual(snapshot["connects"], 1)
+        self.assertEqual(snapshot["checked_out"], 0)
+
+
+class RequestMetricsCase(unittest.TestCase):
+    """
+    This class represents the per route request metrics test case
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_prometheus_text(self):
+        metrics = RequestMetrics(directory=None)
+        metrics.observe("retrieve_actors", "GET", 200, 0.02, {"db": 0.004})
+        metrics.observe("retrieve_actors", "GET", 401, 0.001, {"db": 0.0})
+        text = metrics.render()
+
+        self.assertIn(
+            'http_requests_total{endpoint="retrieve_actors",method="GET",status="200"} 1',
+            text,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{endpoint="retrieve_actors",method="GET",le="0.025"} 2',
+            text,
+        )
+        self.assertIn(
+            'http_request_phase_seconds_count{endpoint="retrieve_actors",phase="db"} 2',
+            text,
+        )
+
+    def test_workers_are_added_up(self):
+        first = RequestMetrics(directory=self.directory, flush_interval=0)
+        second = RequestMetrics(directory=self.directory, flush_interval=0)
+        first.observe("retrieve_movies", "GET", 200, 0.01, {})
+        second.observe("retrieve_movies", "GET", 200, 0.03, {})
+        second.flush()
+        collected = first.collect()
+
+        self.assertEqual(collected["requests"], [["retrieve_movies", "GET", "200", 2]])
+        self.assertEqual(collected["durations"][0][2]["count"], 2)
+
+    def test_exited_workers_are_folded_in_one_file(self):
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        snapshot = RequestMetrics(directory=None)
+        snapshot.observe("retrieve_movies", "GET", 200, 0.01, {})
+        for timestamp in (1, 2):
+            path = os.path.join(self.directory, f"metrics-{exited.pid}-{timestamp}.json")
+            with open(path, "w") as metrics_file:
+                json.dump(snapshot.snapshot(), metrics_file)
+        metrics = RequestMetrics(directory=self.directory, flush_interval=0)
+        metrics.observe("retrieve_movies", "GET", 200, 0.03, {})
+
+        for _ in range(2):
+            collected = metrics.collect()
+            self.assertEqual(collected["requests"], [["retrieve_movies", "GET", "200", 3]])
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted(["metrics.lock", "metrics-exited.json", os.path.basename(metrics._path)]),
+        )
+
+    def test_counters_of_the_workers_are_added_up(self):
+        first = RequestMetrics(directory=self.directory, flush_interval=0)
+        second = RequestMetrics(directory=self.directory, flush_interval=0)
+        first.add_counter("cache_hits_total", "Cache hits.", lambda: 3)
+        second.add_counter("cache_hits_total", "Cache hits.", lambda: 4)
+        second.flush()
+        text = first.render()
+
+        self.assertIn("# TYPE cache_hits_total counter", text)
+        self.assertIn("cache_hits_total 7", text)
+
+    def test_request_phases(self):
+        metrics = RequestMetrics(directory=None)
+        app = Flask(__name__)
+        setup_request_metrics(app, metrics)
+
+        @app.route("/items")
+        def list_items():
+            add_phase_time("auth", 0.5)
+            return jsonify({"items": list(range(100))})
+
+        app.test_client().get("/items")
+        phases = {phase: snapshot for _, phase, snapshot in metrics.snapshot()["phases"]}
+
+        self.assertEqual(phases["auth"]["sum"], 0.5)
+        self.assertGreater(phases["serialization"]["sum"], 0)
+        self.assertEqual(set(phases), {"auth", "db", "serialization", "app"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from werkzeug.datastructures import MultiDict
+from filters import FilterError
+from models import Actor, GenderType, Movie
+from projections import PAYLOAD_FIELDS, get_fields, projection_serializer
+
+
+class FieldsCase(unittest.TestCase):
+    """
+    This class represents the ?fields= projection argument test case
+    """
+
+    def test_every_field_by_default(self):
+        self.assertEqual(get_fields(MultiDict(), Movie), PAYLOAD_FIELDS[Movie])
+
+    def test_payload_order(self):
+        self.assertEqual(
+            get_fields(MultiDict({"fields": "name, id,name"}), Actor), ("id", "name")
+        )
+
+    def test_invalid_fields(self):
+        for value in ("", " , ", "id,version", "password"):
+            with self.assertRaises(FilterError):
+                get_fields(MultiDict({"fields": value}), Actor)
+
+
+class ProjectedRowsCase(unittest.TestCase):
+    """
+    This class represents the column projected read path test case
+    """
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Actor.__table__.create(self.engine)
+        with Session(self.engine) as session:
+            session.add(Actor("Sandy", 20, GenderType.female, "s@x.com", "1", "p", True))
+            session.commit()
+
+    def test_rows_match_the_model_payload(self):
+        fields = PAYLOAD_FIELDS[Actor]
+        with Session(self.engine) as session:
+            row = session.query(*(getattr(Actor, field) for field in fields)).one()
+            self.assertEqual(len(session.identity_map), 0)
+            actor = session.query(Actor).one()
+
+            self.assertEqual(projection_serializer(Actor, fields)(row), actor.format_json())
+
+    def test_narrowed_payload(self):
+        with Session(self.engine) as session:
+            row = session.query(Actor.gender, Actor.id).one()
+
+        self.assertEqual(
+            projection_serializer(Actor, ("id", "gender"))(row),
+            {"id": 1, "gender": "female"},
+        )
+        self.assertIs(
+            projection_serializer(Actor, ("id", "gender")),
+            projection_serializer(Actor, ("id", "gender")),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from queries import SlowQueryLog, fingerprint, setup_query_profiling
+
+
+class FingerprintCase(unittest.TestCase):
+    """
+    This class represents the SQL fingerprint test case
+    """
+
+    def test_literals_and_parameters(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM \"Actors\"  WHERE id = %(id_1)s AND name = 'Sandy'"),
+            'SELECT * FROM "Actors" WHERE id = ? AND name = ?',
+        )
+
+    def test_lists_and_rows_collapse(self):
+        self.assertEqual(
+            fingerprint("SELECT 1 WHERE id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s)"),
+            fingerprint("SELECT 1 WHERE id IN (%(id_1_1)s)"),
+        )
+        self.assertEqual(
+            fingerprint("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y')"),
+            "INSERT INTO t (a, b) VALUES (?)",
+        )
+
+
+class SlowQueryLogCase(unittest.TestCase):
+    """
+    This class represents the slow query log test case
+    """
+
+    def test_only_slow_statements_are_kept(self):
+        log = SlowQueryLog(threshold_ms=100)
+        with self.assertLogs("queries", "WARNING") as logs:
+            log.record("SELECT 1 WHERE id = 3", 0.01)
+            log.record("SELECT 1 WHERE id = 4", 0.2, "retrieve_actor")
+            log.record("SELECT 1 WHERE id = 5", 0.4, "retrieve_actor")
+        snapshot = log.snapshot()
+
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual(snapshot[0]["count"], 2)
+        self.assertEqual(snapshot[0]["max_ms"], 400.0)
+        self.assertEqual(snapshot[0]["endpoints"], ["retrieve_actor"])
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("Slow query", logs.output[0])
+
+
+class QueryProfilingCase(unittest.TestCase):
+    """
+    This class represents the per request query accounting test case
+    """
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        app = Flask(__name__)
+        app.config["QUERY_DEBUG"] = True
+        setup_query_profiling(app, threshold=3)
+
+        @app.route("/items/<int:count>")
+        def list_items(count):
+            with engine.connect() as connection:
+                items = [
+                    connection.execute(text("SELECT :id"), {"id": item}).scalar()
+                    for item in range(count)
+                ]
+            return jsonify(items)
+
+        self.client = app.test_client()
+
+    def test_debug_headers(self):
+        res = self.client.get("/items/2")
+
+        self.assertEqual(res.headers["X-Query-Count"], "2")
+        self.assertGreaterEqual(float(res.headers["X-DB-Time"]), 0)
+
+    def test_failed_statements_leave_nothing_on_the_connection(self):
+        engine = create_engine("sqlite://")
+        with engine.connect() as connection:
+            for _ in range(3):
+                with self.assertRaises(OperationalError):
+                    connection.execute(text("SELECT * FROM missing"))
+            connection.execute(text("SELECT 1"))
+
+            self.assertNotIn("query_start", connection.connection.info)
+
+    def test_repeated_statement_warning(self):
+        with self.assertLogs("queries", "WARNING") as logs:
+            self.client.get("/items/3")
+            self.client.get("/items/5")
+
+        warnings = [line for line in logs.output if "N+1" in line]
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("5 runs", warnings[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import os
+import tempfile
+import unittest
+from flask import Flask, jsonify
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Column, Integer, String, create_engine
+from test_helpers import FakeClock
+from replicas import PIN_COOKIE, PIN_HEADER, ReplicaSet, RoutingSession, setup_replicas
+
+
+class ReplicaSetCase(unittest.TestCase):
+    """
+    This class represents the read replica selection test case
+    """
+
+    def setUp(self):
+        self.engines = [create_engine("sqlite://"), create_engine("sqlite://")]
+        self.lags = {engine: 0 for engine in self.engines}
+        self.clock = FakeClock(100.0)
+        self.replicas = ReplicaSet(
+            self.engines,
+            max_lag=10,
+            check_interval=5,
+            retry_after=30,
+            lag=lambda engine: self.lags[engine],
+            clock=self.clock,
+        )
+
+    def test_round_robin(self):
+        selected = [self.replicas.select() for _ in range(4)]
+
+        self.assertEqual(selected, self.engines * 2)
+
+    def test_lagging_replica_is_left_aside(self):
+        self.lags[self.engines[0]] = 60
+        selected = [self.replicas.select() for _ in range(3)]
+
+        self.assertEqual(selected, [self.engines[1]] * 3)
+
+        self.lags[self.engines[0]] = 0
+        self.clock.now += 31
+        self.assertIn(self.engines[0], [self.replicas.select() for _ in range(2)])
+
+    def test_no_healthy_replica(self):
+        for engine in self.engines:
+            self.replicas.mark_down(engine)
+
+        self.assertIsNone(self.replicas.select())
+
+
+class RoutingSessionCase(unittest.TestCase):
+    """
+    This class represents the read/write routing test case, with a primary
+    and a replica database holding different rows
+    """
+
+    def setUp(self):
+        self.paths = []
+        for _ in range(2):
+            handle, path = tempfile.mkstemp(suffix=".db")
+            os.close(handle)
+            self.paths.append(path)
+        primary, replica = (f"sqlite:///{path}" for path in self.paths)
+
+        db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+        class Item(db.Model):
+            id = Column(Integer, primary_key=True)
+            name = Column(String)
+
+        app = Flask(__name__)
+        app.config.update(SQLALCHEMY_DATABASE_URI=primary, DATABASE_REPLICA_URIS=[replica])
+        db.init_app(app)
+        setup_replicas(app, {})
+        app.extensions["replicas"].lag = lambda engine: 0
+        with app.app_context():
+            db.create_all()
+            db.metadata.create_all(app.extensions["replicas"].engines[0])
+            db.session.add(Item(name="primary"))
+            db.session.commit()
+            app.extensions["replicas"].engines[0].execute(
+                Item.__table__.insert().values(name="replica")
+            )
+
+        @app.route("/items", methods=["GET"])
+        def list_items():
+            return jsonify([item.name for item in Item.query.order_by(Item.id)])
+
+        @app.route("/items", methods=["POST"])
+        def add_item():
+            db.session.add(Item(name="new"))
+            db.session.commit()
+            return jsonify(success=True)
+
+        self.app = app
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.app.extensions["replicas"].dispose()
+        for path in self.paths:
+            os.remove(path)
+
+    def test_reads_go_to_the_replica(self):
+        res = self.client.get("/items")
+
+        self.assertEqual(res.get_json(), ["replica"])
+
+    def test_pin_header_reads_from_the_primary(self):
+        res = self.client.get("/items", headers={PIN_HEADER: "1"})
+
+        self.assertEqual(res.get_json(), ["primary"])
+
+    def test_client_reads_its_own_writes(self):
+        res = self.client.post("/items")
+
+        self.assertIn(f"{PIN_COOKIE}=1", res.headers["Set-Cookie"])
+        self.assertEqual(self.client.get("/items").get_json(), ["primary", "new"])
+        self.assertEqual(self.app.test_client().get("/items").get_json(), ["replica"])
+
+
+class OneReplicaPerRequestCase(unittest.TestCase):
+    """
+    This class represents the per request replica test case, with two
+    replicas holding different rows
+    """
+
+    def setUp(self):
+        self.paths = []
+        for _ in range(3):
+            handle, path = tempfile.mkstemp(suffix=".db")
+            os.close(handle)
+            self.paths.append(path)
+        primary, *replicas = (f"sqlite:///{path}" for path in self.paths)
+
+        db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+        class Item(db.Model):
+            id = Column(Integer, primary_key=True)
+            name = Column(String)
+
+        app = Flask(__name__)
+        app.config.update(SQLALCHEMY_DATABASE_URI=primary, DATABASE_REPLICA_URIS=replicas)
+        db.init_app(app)
+        setup_replicas(app, {})
+        app.extensions["replicas"].lag = lambda engine: 0
+        with app.app_context():
+            db.create_all()
+            for index, engine in enumerate(app.extensions["replicas"].engines):
+                db.metadata.create_all(engine)
+                engine.execute(Item.__table__.insert().values(name=f"replica{index}"))
+
+        @app.route("/items")
+        def list_items():
+            return jsonify([Item.query.one().name for _ in range(4)])
+
+        self.app = app
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.app.extensions["replicas"].dispose()
+        for path in self.paths:
+            os.remove(path)
+
+    def test_statements_of_a_request_use_one_replica(self):
+        first = self.client.get("/items").get_json()
+        second = self.client.get("/items").get_json()
+
+        self.assertEqual(first, ["replica0"] * 4)
+        self.assertEqual(second, ["replica1"] * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
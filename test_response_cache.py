@@ -0,0 +1,138 @@
+import fnmatch
+import unittest
+from flask import Flask, Response, request
+from response_cache import LRUCacheBackend, RedisCacheBackend, ResponseCache
+from test_helpers import FakeClock
+
+
+class LocalRedis:
+    """Minimal in-memory stand-in of the redis-py client used by the cache."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def sadd(self, key, *members):
+        self.values.setdefault(key, set()).update(members)
+
+    def smembers(self, key):
+        return set(self.values.get(key, set()))
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def scan_iter(self, pattern):
+        return [key for key in list(self.values) if fnmatch.fnmatch(key, pattern)]
+
+
+def entry(body):
+    return {"body": body, "status": 200, "mimetype": "application/json", "etag": "v1"}
+
+
+class LRUCacheBackendCase(unittest.TestCase):
+    """
+    This class represents the in-process response cache backend test case
+    """
+
+    def test_least_recently_used_entry_is_evicted(self):
+        backend = LRUCacheBackend(max_entries=2)
+        backend.set("a", entry(b"{}"), ["Actors"])
+        backend.set("b", entry(b"{}"), ["Actors"])
+        backend.get("a")
+        backend.set("c", entry(b"{}"), ["Movies"])
+
+        self.assertIsNotNone(backend.get("a"))
+        self.assertIsNone(backend.get("b"))
+
+    def test_size_bound(self):
+        backend = LRUCacheBackend(max_bytes=10)
+        backend.set("a", entry(b"123456"), ["Actors"])
+        backend.set("b", entry(b"123456"), ["Actors"])
+
+        self.assertIsNone(backend.get("a"))
+        self.assertIsNotNone(backend.get("b"))
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        backend = LRUCacheBackend(ttl=300, clock=clock)
+        backend.set("a", entry(b"{}"), ["Actors"])
+        clock.now = 299
+
+        self.assertIsNotNone(backend.get("a"))
+
+        clock.now = 300
+        self.assertIsNone(backend.get("a"))
+        self.assertEqual(len(backend), 0)
+
+    def test_invalidate_only_tagged_entries(self):
+        backend = LRUCacheBackend()
+        backend.set("list", entry(b"[]"), ["Actors"])
+        backend.set("row-1", entry(b"{}"), ["Actors:1"])
+        backend.set("row-2", entry(b"{}"), ["Actors:2"])
+        backend.invalidate("Actors:1")
+
+        self.assertIsNotNone(backend.get("list"))
+        self.assertIsNone(backend.get("row-1"))
+        self.assertIsNotNone(backend.get("row-2"))
+
+
+class ResponseCacheCase(unittest.TestCase):
+    """
+    This class represents the response cache test case, run against the
+    shared store backend with a local stand-in
+    """
+
+    def setUp(self):
+        self.redis = LocalRedis()
+        self.cache = ResponseCache(RedisCacheBackend(self.redis))
+        self.app = Flask(__name__)
+
+    def test_round_trip(self):
+        self.cache.put("key", Response(b'{"success": true}', mimetype="application/json"), "v1", ["Actors"])
+        response = self.cache.get("key", "v1")
+
+        self.assertEqual(response.get_data(), b'{"success": true}')
+        self.assertEqual(response.headers["ETag"], '"v1"')
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_entry_with_another_etag_is_not_served(self):
+        self.cache.put("key", Response(b"{}"), "v1", ["Actors"])
+
+        self.assertIsNone(self.cache.get("key", "v2"))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_invalidate_table(self):
+        self.cache.put("list", Response(b"[]"), "v1", ["Actors"])
+        self.cache.put("movies", Response(b"[]"), "v1", ["Movies"])
+
+        class Actor:
+            __tablename__ = "Actors"
+
+        self.cache.invalidate_table(Actor)
+
+        self.assertIsNone(self.cache.get("list", "v1"))
+        self.assertIsNotNone(self.cache.get("movies", "v1"))
+
+    def test_key_depends_on_permissions(self):
+        with self.app.test_request_context("/actors?limit=2&cursor=x"):
+            producer = self.cache.key_for(request, {"permissions": ["get:actors", "post:actor"]})
+            assistant = self.cache.key_for(request, {"permissions": ["get:actors"]})
+
+        with self.app.test_request_context("/actors?cursor=x&limit=2"):
+            reordered = self.cache.key_for(request, {"permissions": ["post:actor", "get:actors"]})
+
+        self.assertNotEqual(producer, assistant)
+        self.assertEqual(producer, reordered)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import enum
+import json
+import unittest
+from collections import namedtuple
+from datetime import datetime
+from flask import Flask, jsonify
+from json_provider import FastJSONProvider, encoder
+from models import Actor, GenderType, Movie, serialize_actor, serialize_movie
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Color(enum.Enum):
+    red = "red"
+
+
+class SerializerCase(unittest.TestCase):
+    """
+    This class represents the precompiled model serializer test case
+    """
+
+    def test_actor_payload(self):
+        actor = Actor("Sandy", 20, GenderType.female, "s@x.com", "123", "p", True)
+        actor.id = 3
+        payload = actor.format_json()
+
+        self.assertEqual(
+            list(payload),
+            ["id", "name", "age", "gender", "email", "phone", "photo", "seeking_movie"],
+        )
+        self.assertEqual(payload["gender"], "female")
+        self.assertEqual(payload["id"], 3)
+
+    def test_movie_payload(self):
+        movie = Movie("Smile", ["Comedy"], datetime(2040, 1, 2), False)
+        movie.id = 1
+
+        self.assertEqual(
+            serialize_movie(movie),
+            {
+                "id": 1,
+                "title": "Smile",
+                "genres": ["Comedy"],
+                "release_date": "2040-01-02 00:00:00",
+                "seeking_actor": False,
+            },
+        )
+        movie.release_date = None
+        self.assertIsNone(serialize_movie(movie)["release_date"])
+
+    def test_rows(self):
+        Row = namedtuple("Row", serialize_actor.fields)
+        row = Row(1, "Luna", 25, GenderType.female, "l@x.com", "1", "p", False)
+
+        self.assertEqual(serialize_actor(row)["gender"], "female")
+        self.assertEqual(tuple(serialize_actor(row)), serialize_actor.fields)
+
+
+class JSONProviderCase(unittest.TestCase):
+    """
+    This class represents the fast JSON provider test case
+    """
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["JSON_BACKEND"] = "stdlib"
+        self.app.json = FastJSONProvider(self.app)
+
+        @self.app.route("/")
+        def index():
+            return jsonify({"b": 1, "a": Color.red, "at": datetime(2040, 1, 2), "ç": "ã"})
+
+        self.client = self.app.test_client()
+
+    def test_response(self):
+        res = self.client.get("/")
+
+        self.assertEqual(res.mimetype, "application/json")
+        self.assertEqual(
+            res.data.decode("utf-8"),
+            '{"b":1,"a":"red","at":"2040-01-02 00:00:00","ç":"ã"}\n',
+        )
+
+    def test_sort_keys_and_debug(self):
+        self.app.json.sort_keys = True
+        self.app.debug = True
+        data = self.client.get("/").get_json()
+
+        self.assertEqual(list(data), ["a", "at", "b", "ç"])
+        with self.app.app_context():
+            self.assertEqual(self.app.json.dumps([1, 2]), "[1,2]")
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_backends_agree(self):
+        payload = {"id": 1, "gender": GenderType.male, "at": datetime(2040, 1, 2, 3)}
+
+        self.assertEqual(encoder("orjson")(payload), encoder("stdlib")(payload))
+        self.assertEqual(json.loads(encoder("orjson")(payload))["gender"], "male")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import io
+import os
+import sys
+import json
+import subprocess
+import unittest
+from startup import StartupProfile
+from test_helpers import FakeClock
+
+
+class StartupProfileCase(unittest.TestCase):
+    """
+    This class represents the cold start profiling test case
+    """
+
+    def test_marks_record_time_since_previous_mark(self):
+        clock = FakeClock()
+        profile = StartupProfile(enabled=True, clock=clock)
+        clock.now = 0.25
+        profile.mark("import")
+        clock.now = 0.26
+        profile.mark("create_app")
+        output = io.StringIO()
+        profile.report(file=output)
+
+        self.assertEqual(
+            [json.loads(line) for line in output.getvalue().splitlines()],
+            [{"phase": "import", "ms": 250.0}, {"phase": "create_app", "ms": 10.0}],
+        )
+
+    def test_disabled_profile_records_nothing(self):
+        profile = StartupProfile(enabled=False)
+        profile.mark("import")
+
+        self.assertEqual(profile.phases, [])
+
+    def test_worker_does_not_import_deferred_modules(self):
+        env = dict(os.environ, DB_PORT=os.environ.get("DB_PORT") or "5432")
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, json, app; print(json.dumps(sorted(sys.modules)))",
+            ],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        modules = json.loads(output.strip().splitlines()[-1])
+
+        for module in ("flask_migrate", "alembic", "jose.jwt", "jwt"):
+            self.assertNotIn(module, modules)
+
+
+if __name__ == "__main__":
+    unittest.main()